@@ -1,13 +1,31 @@
 """CLI interface for QueueCTL."""
 import click
-import json
 import sys
-import uuid
-from datetime import datetime
+from itertools import islice
 from typing import Optional
-from .models import Job, JobState
+from .models import Job, JobState, _json_loads, _new_id
 from .storage import JobStorage
-from .worker import Worker, start_workers
+
+
+# Icons shown next to each state in `queuectl status`
+_STATE_ICONS = {
+    JobState.PENDING: "⏳",
+    JobState.PROCESSING: "⚙️ ",
+    JobState.COMPLETED: "✓ ",
+    JobState.FAILED: "✗ ",
+    JobState.DEAD: "💀",
+}
+
+
+def _job_from_data(data, max_retries: int) -> Job:
+    """Build a job from a parsed JSON object, or from a plain command."""
+    if not isinstance(data, dict):
+        data = {"command": data}
+    # argv is derived from the command when the job is stored
+    data.pop("argv", None)
+    data.setdefault("id", _new_id())
+    data.setdefault("max_retries", max_retries)
+    return Job.from_dict(data)
 
 
 @click.group()
@@ -19,39 +37,66 @@ def main():
 @main.command()
 @click.argument("job_data", required=False, default=None)
 @click.option("--max-retries", default=3, type=int, help="Maximum retry attempts")
-def enqueue(job_data: Optional[str], max_retries: int):
-    """Enqueue a new job.
+@click.option("--file", "jobs_file", type=click.File("r"), default=None,
+              help="Enqueue jobs from a file with one JSON job, JSON array of jobs or command per line ('-' for stdin)")
+def enqueue(job_data: Optional[str], max_retries: int, jobs_file):
+    """Enqueue a new job, or many at once.
+    
+    A JSON array, or a file, is added in a single transaction.
     
     Examples:
     queuectl enqueue "echo hello"
     queuectl enqueue '{"id":"job1","command":"echo hello"}' --max-retries 5
+    queuectl enqueue '[{"command":"echo one"},{"command":"echo two"}]'
+    queuectl enqueue --file jobs.jsonl
     """
+    import json
+    
     storage = JobStorage()
     
     try:
+        if jobs_file:
+            jobs = []
+            for line in jobs_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = _json_loads(line)
+                except json.JSONDecodeError:
+                    data = None
+                if isinstance(data, list):
+                    jobs.extend(_job_from_data(item, max_retries) for item in data)
+                else:
+                    # A JSON job or command string, or else a plain command line
+                    jobs.append(_job_from_data(data if isinstance(data, (dict, str)) else line, max_retries))
+            
+            count = storage.add_jobs(jobs)
+            click.echo(f"✓ {count} job(s) enqueued")
+            return
+        
         if job_data:
             # Try to parse as JSON first
             try:
-                data = json.loads(job_data)
-                job = Job.from_dict(data)
+                # Arrays go through the batch decoder; a single object does
+                # not need orjson imported
+                loads = _json_loads if job_data.lstrip().startswith("[") else json.loads
+                data = loads(job_data)
             except json.JSONDecodeError:
-                # If not JSON, treat as plain command string
-                job = Job(
-                    id=str(uuid.uuid4())[:8],
-                    command=job_data, 
-                    max_retries=max_retries
-                )
+                data = None
+            if isinstance(data, list):
+                count = storage.add_jobs(_job_from_data(item, max_retries) for item in data)
+                click.echo(f"✓ {count} job(s) enqueued")
+                return
+            # A JSON job or command string, or else a plain command
+            job = _job_from_data(data if isinstance(data, (dict, str)) else job_data, max_retries)
         else:
             # Interactive mode
             click.echo("Enter job details:")
             command = click.prompt("Command to execute")
             max_retries = click.prompt("Max retries", default=3, type=int)
             
-            job = Job(
-                id=str(uuid.uuid4())[:8],
-                command=command,
-                max_retries=max_retries,
-            )
+            job = _job_from_data(command, max_retries)
         
         storage.add_job(job)
         click.echo(f"✓ Job enqueued: {job.id}")
@@ -70,15 +115,21 @@ def worker():
 
 @worker.command()
 @click.option("--count", default=1, type=int, help="Number of workers to start")
-@click.option("--poll-interval", default=1.0, type=float, help="Poll interval in seconds")
-def start(count: int, poll_interval: float):
+@click.option("--poll-interval", default=1.0, type=float,
+              help="Poll interval in seconds when enqueue wake-ups are unavailable (e.g. Windows)")
+@click.option("--verbose", "-v", is_flag=True, help="Also log each job as it starts and completes")
+def start(count: int, poll_interval: float, verbose: bool):
     """Start one or more workers.
     
     Example:
     queuectl worker start --count 3
     """
+    # Only this command needs the worker machinery
+    import logging
+    from .worker import start_workers
+    
     try:
-        start_workers(count, poll_interval)
+        start_workers(count, poll_interval, logging.DEBUG if verbose else logging.INFO)
     except KeyboardInterrupt:
         click.echo("\nWorkers stopped.")
 
@@ -105,8 +156,8 @@ def status():
     storage = JobStorage()
     
     try:
-        counts = storage.count_jobs_by_state()
-        dlq_jobs = storage.get_dlq_jobs()
+        summary = storage.get_status_summary()
+        counts = summary["counts"]
         
         click.echo("\n" + "="*50)
         click.echo("Queue Status".center(50))
@@ -115,16 +166,10 @@ def status():
         click.echo(f"\nJob States:")
         for state in JobState:
             count = counts.get(state.value, 0)
-            icon = {
-                JobState.PENDING: "⏳",
-                JobState.PROCESSING: "⚙️ ",
-                JobState.COMPLETED: "✓ ",
-                JobState.FAILED: "✗ ",
-                JobState.DEAD: "💀",
-            }.get(state, "  ")
+            icon = _STATE_ICONS.get(state, "  ")
             click.echo(f"  {icon} {state.value.ljust(12)} : {count}")
         
-        click.echo(f"\nDead Letter Queue: {len(dlq_jobs)} jobs")
+        click.echo(f"\nDead Letter Queue: {summary['dlq_count']} jobs")
         
         click.echo("\n" + "="*50 + "\n")
     
@@ -133,10 +178,10 @@ def status():
         sys.exit(1)
 
 
-@main.command()
+@main.command(name="list")
 @click.option("--state", default=None, help="Filter by job state (pending, completed, failed, dead, processing)")
 @click.option("--limit", default=50, type=int, help="Limit number of results")
-def list(state: Optional[str], limit: int):
+def list_jobs(state: Optional[str], limit: int):
     """List jobs, optionally filtered by state.
     
     Example:
@@ -147,11 +192,12 @@ def list(state: Optional[str], limit: int):
     
     try:
         if state:
-            jobs = storage.get_jobs_by_state(state)
+            job_iter = storage.iter_jobs_by_state(state)
         else:
-            jobs = storage.get_all_jobs()
+            job_iter = storage.iter_all_jobs()
         
-        jobs = jobs[:limit]
+        # Stop stepping the query once `limit` jobs have been read
+        jobs = tuple(islice(job_iter, limit))
         
         if not jobs:
             click.echo("No jobs found.")
@@ -159,18 +205,21 @@ def list(state: Optional[str], limit: int):
         
         click.echo(f"\n{len(jobs)} job(s) found:\n")
         
+        # Build the listing and write it once rather than per line
+        lines = []
         for job in jobs:
-            click.echo(f"ID: {job.id}")
-            click.echo(f"  State:      {job.state}")
-            click.echo(f"  Command:    {job.command}")
-            click.echo(f"  Attempts:   {job.attempts}/{job.max_retries}")
-            click.echo(f"  Created:    {job.created_at}")
-            click.echo(f"  Updated:    {job.updated_at}")
+            lines.append(f"ID: {job.id}")
+            lines.append(f"  State:      {job.state}")
+            lines.append(f"  Command:    {job.command}")
+            lines.append(f"  Attempts:   {job.attempts}/{job.max_retries}")
+            lines.append(f"  Created:    {job.created_at}")
+            lines.append(f"  Updated:    {job.updated_at}")
             if job.next_retry_at:
-                click.echo(f"  Retry at:   {job.next_retry_at}")
+                lines.append(f"  Retry at:   {job.next_retry_at}")
             if job.error_message:
-                click.echo(f"  Error:      {job.error_message}")
-            click.echo()
+                lines.append(f"  Error:      {job.error_message}")
+            lines.append("")
+        click.echo("\n".join(lines))
     
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -194,8 +243,7 @@ def dlq_list(limit: int):
     storage = JobStorage()
     
     try:
-        jobs = storage.get_dlq_jobs()
-        jobs = jobs[:limit]
+        jobs = storage.get_dlq_jobs(limit=limit)
         
         if not jobs:
             click.echo("Dead Letter Queue is empty.")
@@ -203,15 +251,17 @@ def dlq_list(limit: int):
         
         click.echo(f"\n{len(jobs)} job(s) in DLQ:\n")
         
+        lines = []
         for job in jobs:
-            click.echo(f"ID: {job.id}")
-            click.echo(f"  Command:    {job.command}")
-            click.echo(f"  Attempts:   {job.attempts}")
-            click.echo(f"  Max Retries: {job.max_retries}")
-            click.echo(f"  Created:    {job.created_at}")
+            lines.append(f"ID: {job.id}")
+            lines.append(f"  Command:    {job.command}")
+            lines.append(f"  Attempts:   {job.attempts}")
+            lines.append(f"  Max Retries: {job.max_retries}")
+            lines.append(f"  Created:    {job.created_at}")
             if job.error_message:
-                click.echo(f"  Error:      {job.error_message}")
-            click.echo()
+                lines.append(f"  Error:      {job.error_message}")
+            lines.append("")
+        click.echo("\n".join(lines))
     
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -219,32 +269,37 @@ def dlq_list(limit: int):
 
 
 @dlq.command(name="retry")
-@click.argument("job_id")
-def dlq_retry(job_id: str):
-    """Retry a job from the Dead Letter Queue.
+@click.argument("job_ids", nargs=-1)
+@click.option("--all", "retry_all", is_flag=True, help="Retry every job in the DLQ")
+def dlq_retry(job_ids: tuple, retry_all: bool):
+    """Retry jobs from the Dead Letter Queue.
     
-    Example:
+    Examples:
     queuectl dlq retry job1
+    queuectl dlq retry job1 job2 job3
+    queuectl dlq retry --all
     """
+    if retry_all == bool(job_ids):
+        click.echo("Error: give one or more job IDs, or --all", err=True)
+        sys.exit(1)
+    
     storage = JobStorage()
     
     try:
-        job = storage.get_dlq_job(job_id)
+        # Jobs are reset to pending with no attempts in one transaction
+        retried = storage.retry_dlq(None if retry_all else job_ids)
         
-        if not job:
+        if retry_all or len(job_ids) > 1:
+            click.echo(f"✓ {len(retried)} job(s) moved back to queue for retry")
+        elif retried:
+            click.echo(f"✓ Job {retried[0]} moved back to queue for retry")
+        
+        found = set(retried)
+        missing = [job_id for job_id in job_ids if job_id not in found]
+        for job_id in missing:
             click.echo(f"Job {job_id} not found in DLQ", err=True)
+        if missing:
             sys.exit(1)
-        
-        # Reset job state for retry
-        job.state = JobState.PENDING
-        job.attempts = 0
-        job.error_message = None
-        job.next_retry_at = None
-        
-        storage.add_job(job)
-        storage.remove_from_dlq(job_id)
-        
-        click.echo(f"✓ Job {job_id} moved back to queue for retry")
     
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -351,6 +406,8 @@ def show(job_id: str):
     Example:
     queuectl show job1
     """
+    import json
+    
     storage = JobStorage()
     
     try:
@@ -0,0 +1,27 @@
+"""Logging for queuectl workers.
+
+Worker processes hand their log records to a multiprocessing queue, and a
+listener thread in the parent writes them out, so a worker never blocks on
+stdout between jobs.
+"""
+import logging
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger("queuectl")
+
+
+def start_listener(queue) -> QueueListener:
+    """Start writing records received on `queue` to stdout."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(queue, handler)
+    listener.start()
+    return listener
+
+
+def log_to_queue(queue, level: int = logging.INFO) -> None:
+    """Send this process's queuectl records to `queue` at `level` and above."""
+    logger.handlers[:] = [QueueHandler(queue)]
+    logger.setLevel(level)
+    logger.propagate = False
@@ -1,8 +1,126 @@
 """Data models for job queue system."""
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import json
+import os
+import shlex
+import time
+
+# The orjson module once imported, None if it is not installed, or False
+# before the first batch needed it
+_orjson_module = False
+
+
+def _orjson():
+    """Return the optional orjson module, importing it on first use.
+    
+    Only batch paths use it, so other commands skip the import.
+    """
+    global _orjson_module
+    if _orjson_module is False:
+        try:
+            import orjson
+        except ImportError:
+            orjson = None
+        _orjson_module = orjson
+    return _orjson_module
+
+
+def _json_dumps(obj) -> str:
+    """Encode `obj` as compact JSON, with orjson when it is installed."""
+    orjson = _orjson()
+    return json.dumps(obj) if orjson is None else orjson.dumps(obj).decode()
+
+
+def _json_loads(data):
+    """Decode JSON, with orjson when it is installed.
+    
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch
+    the latter either way.
+    """
+    orjson = _orjson()
+    return json.loads(data) if orjson is None else orjson.loads(data)
+
+
+# (epoch second, formatted "YYYY-MM-DDTHH:MM:SS") of the last formatted time
+_iso_second_cache = (None, "")
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _format_us(us: int) -> str:
+    """Format epoch microseconds as UTC ISO-8601 with a trailing "Z".
+    
+    The date/time part is formatted at most once per second; calls within
+    the same second only append the microseconds.
+    """
+    global _iso_second_cache
+    second, micros = divmod(us, 1_000_000)
+    cached_second, prefix = _iso_second_cache
+    if second != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _iso_second_cache = (second, prefix)
+    return "%s.%06dZ" % (prefix, micros)
+
+
+def _parse_iso_us(value: Optional[str]) -> Optional[int]:
+    """Convert an ISO-8601 timestamp (naive values are UTC) to epoch microseconds."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+
+def _now_us() -> int:
+    """Return the current time in epoch microseconds."""
+    return time.time_ns() // 1000
+
+
+def _now_iso() -> str:
+    """Return the current UTC time as ISO-8601 with a trailing "Z"."""
+    return _format_us(_now_us())
+
+
+def _new_id() -> str:
+    """Return a random 8-character hex job ID."""
+    return os.urandom(4).hex()
+
+
+# Characters that need a shell: operators, expansions, globs and comments.
+# Quotes are fine, shlex handles them the same way sh does.
+_SHELL_METACHARS = frozenset("|&;<>()$`\\*?[]{}~#!\n")
+
+# Commands that only exist as shell builtins
+_SHELL_BUILTINS = frozenset({
+    ".", ":", "alias", "bg", "break", "cd", "command", "continue", "eval",
+    "exec", "exit", "export", "fg", "getopts", "hash", "jobs", "local",
+    "read", "readonly", "return", "set", "shift", "source", "times",
+    "trap", "type", "ulimit", "umask", "unalias", "unset", "wait",
+})
+
+
+def _command_argv(command: str) -> Optional[List[str]]:
+    """Split a command into argv if it can run without a shell.
+    
+    Returns None for anything that relies on shell syntax or builtins.
+    """
+    if _SHELL_METACHARS.intersection(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    # Empty commands, builtins and VAR=value prefixes stay with the shell
+    if not argv or argv[0] in _SHELL_BUILTINS or "=" in argv[0]:
+        return None
+    return argv
 
 
 class JobState(str, Enum):
@@ -17,6 +135,19 @@ class JobState(str, Enum):
 class Job:
     """Represents a background job."""
     
+    __slots__ = (
+        "id",
+        "command",
+        "state",
+        "attempts",
+        "max_retries",
+        "created_at",
+        "updated_at",
+        "next_retry_at_us",
+        "error_message",
+        "argv",
+    )
+    
     def __init__(
         self,
         id: str,
@@ -26,18 +157,37 @@ class Job:
         max_retries: int = 3,
         created_at: Optional[str] = None,
         updated_at: Optional[str] = None,
-        next_retry_at: Optional[str] = None,
+        next_retry_at_us: Optional[int] = None,
         error_message: Optional[str] = None,
+        argv: Optional[List[str]] = None,
+        next_retry_at: Optional[str] = None,
     ):
         self.id = id
         self.command = command
         self.state = state
         self.attempts = attempts
         self.max_retries = max_retries
-        self.created_at = created_at or datetime.utcnow().isoformat() + "Z"
-        self.updated_at = updated_at or datetime.utcnow().isoformat() + "Z"
-        self.next_retry_at = next_retry_at
+        now = None if created_at and updated_at else _now_iso()
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
+        # Retry deadline in epoch microseconds; next_retry_at is the ISO form
+        self.next_retry_at_us = next_retry_at_us
+        if next_retry_at is not None:
+            self.next_retry_at = next_retry_at
         self.error_message = error_message
+        # Pre-split command for running without a shell; None runs it via sh
+        self.argv = argv
+    
+    @property
+    def next_retry_at(self) -> Optional[str]:
+        """Retry deadline as ISO-8601, for display."""
+        if self.next_retry_at_us is None:
+            return None
+        return _format_us(self.next_retry_at_us)
+    
+    @next_retry_at.setter
+    def next_retry_at(self, value: Optional[str]) -> None:
+        self.next_retry_at_us = _parse_iso_us(value)
     
     def to_dict(self) -> dict:
         """Convert job to dictionary."""
@@ -51,6 +201,7 @@ class Job:
             "updated_at": self.updated_at,
             "next_retry_at": self.next_retry_at,
             "error_message": self.error_message,
+            "argv": self.argv,
         }
     
     @classmethod
@@ -58,6 +209,13 @@ class Job:
         """Create job from dictionary."""
         return cls(**data)
     
+    @classmethod
+    def _from_row(cls, row: tuple) -> "Job":
+        """Create job from a database row selected in constructor order."""
+        *fields, argv = row
+        # argv is stored as a JSON array
+        return cls(*fields, json.loads(argv) if argv else None)
+    
     def to_json(self) -> str:
         """Convert job to JSON string."""
         return json.dumps(self.to_dict())
@@ -2,85 +2,371 @@
 import sqlite3
 import json
 import os
+import select
+import stat
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
-from .models import Job, JobState
+from typing import Iterable, Iterator, List, Optional
+from .models import (
+    Job, JobState, _command_argv, _json_dumps, _now_iso, _now_us, _parse_iso_us,
+)
+
+
+# Bumped whenever the schema changes; stored in PRAGMA user_version
+SCHEMA_VERSION = 1
+
+# Jobs are spread over this many shards (a power of two) so that each
+# worker mostly claims from its own slice of the ready-job index.
+SHARD_COUNT = 8
+
+# Database paths whose schema is known to be current in this process
+_READY_DATABASES = set()
+
+# Signalled whenever this process enqueues jobs, so workers running as
+# threads wake without going through the database. _enqueue_seq is bumped
+# under the condition's lock on every notification.
+_JOBS_ENQUEUED = threading.Condition()
+_enqueue_seq = 0
+
+DEFAULT_CONFIG = {
+    "max_retries": 3,
+    "backoff_base": 2,
+    "backoff_max_seconds": 600,
+    "batch_size": 1,
+    "janitor_interval_s": 5,
+}
+
+# Config row counting set_config() calls, so readers can tell cheaply
+# whether their cached config is stale. Not a user setting.
+_CONFIG_REV_KEY = "config_rev"
+
+# Columns selected for Job rows, in Job.__init__ argument order
+_JOB_COLUMNS = (
+    "id, command, state, attempts, max_retries, created_at, updated_at, "
+    "next_retry_at_us, error_message, argv"
+)
+
+# States a job can be claimed from, written as literals so the planner can
+# match queries against the partial indexes below
+_READY_STATES = f"('{JobState.PENDING.value}', '{JobState.FAILED.value}')"
+
+# Jobs that are ready to run: pending, or failed with the retry time due.
+# Takes the current time in epoch microseconds as its one parameter.
+_READY_WHERE = f"""
+    state IN {_READY_STATES}
+    AND (state = '{JobState.PENDING.value}' OR next_retry_at_us IS NULL OR next_retry_at_us <= ?)
+"""
+
+# Dead letter queue rows keep the job columns plus why and when the job
+# was moved there.
+_DLQ_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dlq (
+        id TEXT PRIMARY KEY,
+        command TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_retries INTEGER NOT NULL DEFAULT 3,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        next_retry_at_us INTEGER,
+        error_message TEXT,
+        moved_at TEXT NOT NULL,
+        reason TEXT,
+        argv TEXT
+    )
+"""
+
+
+# All tables and indexes, created in one transaction by a single
+# executescript() call. Every statement is idempotent.
+_SCHEMA_SCRIPT = f"""
+    BEGIN IMMEDIATE;
+    
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        command TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_retries INTEGER NOT NULL DEFAULT 3,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        -- Epoch microseconds; compared as integers by the ready-job query
+        next_retry_at_us INTEGER,
+        error_message TEXT,
+        locked_until REAL DEFAULT 0,
+        locked_by TEXT,
+        shard INTEGER NOT NULL DEFAULT 0,
+        -- JSON array when the command can run without a shell
+        argv TEXT
+    );
+    
+    {_DLQ_SCHEMA};
+    
+    -- JSON-encoded config values keyed by name
+    CREATE TABLE IF NOT EXISTS config (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    
+    CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+    CREATE INDEX IF NOT EXISTS idx_jobs_state_retry ON jobs(state, next_retry_at_us);
+    
+    -- Claims walk these oldest-first and stop at the first free rows.
+    -- Being partial, they only hold pending and failed jobs, so their size
+    -- does not grow with the completed-job history.
+    CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(created_at)
+        WHERE state IN {_READY_STATES};
+    CREATE INDEX IF NOT EXISTS idx_jobs_ready_shard ON jobs(shard, created_at)
+        WHERE state IN {_READY_STATES};
+    CREATE INDEX IF NOT EXISTS idx_jobs_lock ON jobs(locked_until)
+        WHERE locked_until > 0;
+    
+    COMMIT;
+"""
+
+
+def _shard_for(job_id: str) -> int:
+    """Return the shard a job ID hashes to."""
+    return zlib.crc32(job_id.encode()) & (SHARD_COUNT - 1)
+
+
+def _drain(fd: int) -> None:
+    """Read a non-blocking pipe or FIFO until it is empty."""
+    try:
+        while os.read(fd, 512):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def _dump_argv(argv: Optional[List[str]], dumps=json.dumps) -> Optional[str]:
+    """Encode a job's argv for the argv column."""
+    return dumps(argv) if argv else None
 
 
 class JobStorage:
     """SQLite-based persistent job storage."""
     
     DB_PATH = Path.home() / ".queuectl" / "jobs.db"
+    # Config file used by older versions; imported into the database once
     CONFIG_PATH = Path.home() / ".queuectl" / "config.json"
     
-    def __init__(self):
-        """Initialize storage and create database if needed."""
-        self.db_path = self.DB_PATH
-        self.config_path = self.CONFIG_PATH
+    def __init__(self, path: Optional[Path] = None):
+        """Initialize storage and create database if needed.
+        
+        `path` selects a database other than ~/.queuectl/jobs.db; its
+        wake-up FIFO and legacy config file then live next to it.
+        """
+        if path is None:
+            self.db_path = self.DB_PATH
+            self.config_path = self.CONFIG_PATH
+        else:
+            self.db_path = Path(path)
+            self.config_path = self.db_path.parent / "config.json"
+        # Each thread gets its own connection (and poll marks) in _local;
+        # _connections lists them all, with the pid that opened them.
+        self._local = threading.local()
+        self._connections: List[tuple] = []
+        self._connections_lock = threading.Lock()
+        self.wakeup_path = self.db_path.parent / "wakeup"
+        self._wakeup_fd: Optional[int] = None
+        self._wakeup_pid: Optional[int] = None
+        self._cfg_cache: Optional[dict] = None
+        self._cfg_rev: Optional[int] = None
         self._ensure_db()
-        self._ensure_config()
     
-    def _ensure_db(self):
-        """Create database and tables if they don't exist."""
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
-        
-        # Jobs table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS jobs (
-                id TEXT PRIMARY KEY,
-                command TEXT NOT NULL,
-                state TEXT NOT NULL,
-                attempts INTEGER NOT NULL DEFAULT 0,
-                max_retries INTEGER NOT NULL DEFAULT 3,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                next_retry_at TEXT,
-                error_message TEXT,
-                locked_until REAL DEFAULT 0
+    def _connect(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use.
+        
+        Connections run in autocommit mode; multi-statement writes use
+        explicit transactions. Every thread has its own, so one thread's
+        transaction never picks up another's statements, and each is
+        reopened after a fork so that worker processes never share a
+        handle with their parent.
+        """
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(
+                str(self.db_path),
+                timeout=10.0,
+                isolation_level=None,
+                check_same_thread=False,
+                # Every query text the queue uses stays prepared for the
+                # life of the connection
+                cached_statements=256,
             )
-        """)
+            self._set_pragmas(conn)
+            # Lets SQL that copies rows into jobs compute the shard
+            conn.create_function("job_shard", 1, _shard_for, deterministic=True)
+            local.conn = conn
+            local.pid = os.getpid()
+            # (enqueue sequence, data_version) seen by this thread's last
+            # _poll_for_job(); data_version only compares within a connection
+            local.poll_marks = None
+            with self._connections_lock:
+                self._connections.append((conn, local.pid))
+        return local.conn
+    
+    @staticmethod
+    def _set_pragmas(conn: sqlite3.Connection) -> None:
+        """Apply per-connection tuning for concurrent worker access.
         
-        # DLQ table (dead letter queue)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS dlq (
-                id TEXT PRIMARY KEY,
-                job_data TEXT NOT NULL,
-                moved_at TEXT NOT NULL,
-                reason TEXT
-            )
+        WAL itself is a persistent database setting made during schema
+        setup. With it, NORMAL sync only fsyncs at checkpoints.
+        """
+        conn.executescript("""
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+            PRAGMA wal_autocheckpoint=1000;
+            PRAGMA busy_timeout=10000;
         """)
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run several statements as one write transaction on this thread's connection.
         
-        conn.commit()
-        conn.close()
+        The write lock is taken up front (BEGIN IMMEDIATE), so a busy
+        database is waited on at the start rather than failing when a read
+        transaction tries to upgrade.
+        """
+        conn = self._connect()
+        cursor = conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
     
-    def _ensure_config(self):
-        """Create config file if it doesn't exist."""
-        self.config_path.parent.mkdir(parents=True, exist_ok=True)
+    def close(self) -> None:
+        """Close the database connections opened by this process."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn, pid in connections:
+            if pid == os.getpid():
+                conn.close()
+        self._local = threading.local()
+        if self._wakeup_fd is not None and self._wakeup_pid == os.getpid():
+            os.close(self._wakeup_fd)
+        self._wakeup_fd = None
+        self._wakeup_pid = None
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
+    def __getstate__(self) -> dict:
+        # Connections cannot be pickled (e.g. when a worker is sent to a
+        # spawned process); the child opens its own on first use.
+        state = self.__dict__.copy()
+        for key in ("_local", "_connections", "_connections_lock"):
+            del state[key]
+        state["_wakeup_fd"] = None
+        state["_wakeup_pid"] = None
+        return state
+    
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+    
+    def _ensure_db(self):
+        """Create or upgrade the database schema if needed.
         
-        if not self.config_path.exists():
-            default_config = {
-                "max_retries": 3,
-                "backoff_base": 2,
-                "backoff_max_seconds": 600,
-            }
-            with open(self.config_path, "w") as f:
-                json.dump(default_config, f, indent=2)
+        The schema version is kept in PRAGMA user_version, so an up-to-date
+        database costs one pragma read, and nothing at all for further
+        JobStorage instances in the same process.
+        """
+        if self.db_path in _READY_DATABASES:
+            return
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # WAL lets readers run alongside a writer. The mode is stored in
+            # the database file and cannot be changed inside a transaction.
+            conn.execute("PRAGMA journal_mode=WAL")
+            
+            with self._transaction() as cursor:
+                self._migrate_schema(cursor)
+            
+            conn.executescript(_SCHEMA_SCRIPT)
+            self._seed_config(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        
+        _READY_DATABASES.add(self.db_path)
+    
+    def _migrate_schema(self, cursor: sqlite3.Cursor) -> None:
+        """Bring tables from the original, unversioned layout up to date."""
+        jobs_columns = {row[1] for row in cursor.execute("PRAGMA table_info(jobs)")}
+        if jobs_columns and "next_retry_at_us" not in jobs_columns:
+            # Retry times were ISO-8601 text
+            cursor.execute("ALTER TABLE jobs ADD COLUMN next_retry_at_us INTEGER")
+            rows = cursor.execute(
+                "SELECT id, next_retry_at FROM jobs WHERE next_retry_at IS NOT NULL"
+            ).fetchall()
+            cursor.executemany(
+                "UPDATE jobs SET next_retry_at_us = ? WHERE id = ?",
+                [(_parse_iso_us(next_retry_at), job_id) for job_id, next_retry_at in rows],
+            )
+            # DROP COLUMN needs SQLite 3.35; older versions keep the unused column
+            if sqlite3.sqlite_version_info >= (3, 35, 0):
+                cursor.execute("ALTER TABLE jobs DROP COLUMN next_retry_at")
+            
+            cursor.execute("ALTER TABLE jobs ADD COLUMN locked_by TEXT")
+            cursor.execute("ALTER TABLE jobs ADD COLUMN shard INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("UPDATE jobs SET shard = job_shard(id)")
+            # Existing jobs keep running through the shell
+            cursor.execute("ALTER TABLE jobs ADD COLUMN argv TEXT")
+        
+        # The DLQ stored each job as a JSON blob
+        dlq_columns = {row[1] for row in cursor.execute("PRAGMA table_info(dlq)")}
+        if "job_data" in dlq_columns:
+            cursor.execute("ALTER TABLE dlq RENAME TO dlq_legacy")
+            cursor.execute(_DLQ_SCHEMA)
+            legacy_rows = cursor.execute(
+                "SELECT job_data, moved_at, reason FROM dlq_legacy"
+            ).fetchall()
+            for job_data, moved_at, reason in legacy_rows:
+                self._insert_dlq_row(cursor, Job.from_json(job_data), moved_at, reason)
+            cursor.execute("DROP TABLE dlq_legacy")
+    
+    def _seed_config(self, conn: sqlite3.Connection) -> None:
+        """Fill an empty config table with the defaults."""
+        if conn.execute("SELECT COUNT(*) FROM config").fetchone()[0] > 0:
+            return
+        
+        seed = dict(DEFAULT_CONFIG)
+        # Carry over settings from the JSON config file of older versions
+        if self.config_path.exists():
+            with open(self.config_path, "r") as f:
+                seed.update(json.load(f))
+        conn.executemany(
+            "INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in seed.items()],
+        )
     
     def add_job(self, job: Job) -> None:
         """Add a new job to the queue."""
-        job.updated_at = datetime.utcnow().isoformat() + "Z"
-        
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
+        job.updated_at = _now_iso()
+        # argv is always derived from the command, so the two cannot disagree
+        job.argv = _command_argv(job.command)
         
-        cursor.execute("""
+        self._connect().execute("""
             INSERT OR REPLACE INTO jobs 
-            (id, command, state, attempts, max_retries, created_at, updated_at, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            (id, command, state, attempts, max_retries, created_at, updated_at, error_message, shard, argv)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             job.id,
             job.command,
@@ -90,158 +376,202 @@ class JobStorage:
             job.created_at,
             job.updated_at,
             job.error_message,
+            _shard_for(job.id),
+            _dump_argv(job.argv),
         ))
         
-        conn.commit()
-        conn.close()
+        self._notify_workers()
+    
+    def add_jobs(self, jobs: Iterable[Job]) -> int:
+        """Add many jobs in a single transaction. Returns the number added."""
+        # Build every job first (`jobs` may be a generator creating them), so
+        # the shared updated_at is not older than any job's created_at
+        jobs = list(jobs)
+        updated_at = _now_iso()
+        
+        rows = []
+        for job in jobs:
+            job.updated_at = updated_at
+            job.argv = _command_argv(job.command)
+            rows.append((
+                job.id,
+                job.command,
+                job.state,
+                job.attempts,
+                job.max_retries,
+                job.created_at,
+                job.updated_at,
+                job.error_message,
+                _shard_for(job.id),
+                _dump_argv(job.argv, _json_dumps),
+            ))
+        
+        with self._transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO jobs 
+                (id, command, state, attempts, max_retries, created_at, updated_at, error_message, shard, argv)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        
+        self._notify_workers(len(rows))
+        return len(rows)
     
     def get_job(self, job_id: str) -> Optional[Job]:
         """Retrieve a job by ID."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = self._connect().execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
         
         if not row:
             return None
         
-        return Job(
-            id=row["id"],
-            command=row["command"],
-            state=row["state"],
-            attempts=row["attempts"],
-            max_retries=row["max_retries"],
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-            next_retry_at=row["next_retry_at"],
-            error_message=row["error_message"],
+        return Job._from_row(row)
+    
+    def _iter_jobs(self, sql: str, params: tuple = ()) -> Iterator[Job]:
+        """Yield jobs from a query as rows are stepped, without fetchall()."""
+        cursor = self._connect().execute(sql, params)
+        cursor.arraysize = 256
+        try:
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    return
+                for row in rows:
+                    yield Job._from_row(row)
+        finally:
+            # Release the read snapshot if the caller stops early
+            cursor.close()
+    
+    def iter_jobs_by_state(self, state: str) -> Iterator[Job]:
+        """Iterate over jobs with a specific state, oldest first."""
+        return self._iter_jobs(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE state = ? ORDER BY created_at",
+            (state,),
         )
     
-    def get_jobs_by_state(self, state: str) -> List[Job]:
-        """Get all jobs with a specific state."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (state,))
-        rows = cursor.fetchall()
-        conn.close()
-        
-        jobs = []
-        for row in rows:
-            jobs.append(Job(
-                id=row["id"],
-                command=row["command"],
-                state=row["state"],
-                attempts=row["attempts"],
-                max_retries=row["max_retries"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-                next_retry_at=row["next_retry_at"],
-                error_message=row["error_message"],
-            ))
+    def get_jobs_by_state(self, state: str, limit: Optional[int] = None) -> List[Job]:
+        """Get jobs with a specific state, at most `limit` if given."""
+        return list(islice(self.iter_jobs_by_state(state), limit))
+    
+    def iter_ready_jobs(self) -> Iterator[Job]:
+        """Iterate over jobs that are ready to run, oldest first.
         
-        return jobs
-
-    def get_ready_jobs(self) -> List[Job]:
-        """Return jobs that are ready to run.
-
         This includes jobs in `pending` state as well as jobs in `failed`
-        state whose `next_retry_at` timestamp has passed.
+        state whose `next_retry_at_us` time has passed.
         """
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # Select pending jobs
-        cursor.execute("SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (JobState.PENDING.value,))
-        pending_rows = cursor.fetchall()
-
-        # Select failed jobs where next_retry_at is not null and <= now
-        cursor.execute("SELECT * FROM jobs WHERE state = ? AND next_retry_at IS NOT NULL", (JobState.FAILED.value,))
-        failed_rows = cursor.fetchall()
-
-        conn.close()
-
-        jobs: List[Job] = []
-        # Use naive UTC timestamp for comparisons to avoid offset-aware vs naive errors
-        now = datetime.utcnow()
-
-        for row in pending_rows:
-            jobs.append(Job(
-                id=row["id"],
-                command=row["command"],
-                state=row["state"],
-                attempts=row["attempts"],
-                max_retries=row["max_retries"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-                next_retry_at=row["next_retry_at"],
-                error_message=row["error_message"],
-            ))
-
-        for row in failed_rows:
-            next_retry = None
-            if row["next_retry_at"]:
-                try:
-                    next_retry = datetime.fromisoformat(row["next_retry_at"].replace("Z", "+00:00"))
-                    # convert to naive UTC for safe comparison
-                    next_retry = next_retry.replace(tzinfo=None)
-                except Exception:
-                    next_retry = None
-
-            if next_retry is None or next_retry <= now:
-                jobs.append(Job(
-                    id=row["id"],
-                    command=row["command"],
-                    state=row["state"],
-                    attempts=row["attempts"],
-                    max_retries=row["max_retries"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                    next_retry_at=row["next_retry_at"],
-                    error_message=row["error_message"],
-                ))
-
+        return self._iter_jobs(f"""
+            SELECT {_JOB_COLUMNS} FROM jobs
+            WHERE {_READY_WHERE}
+            ORDER BY created_at
+        """, (_now_us(),))
+    
+    def get_ready_jobs(self) -> List[Job]:
+        """Return jobs that are ready to run."""
+        return list(self.iter_ready_jobs())
+    
+    def claim_ready_jobs(self, limit: int = 1, lock_secs: float = 300.0,
+                         worker_id: Optional[str] = None, shard: Optional[int] = None) -> List[Job]:
+        """Atomically claim up to `limit` ready jobs for execution.
+        
+        Claimed jobs are moved to `processing` and locked for `lock_secs`
+        by `worker_id` in the same statement that selects them, so
+        concurrent workers can never claim the same job.
+        
+        With `shard`, only jobs from that shard are claimed; other shards
+        are only used when it has no ready jobs at all (work stealing).
+        """
+        if shard is None:
+            return self._claim_jobs(limit, lock_secs, worker_id, "", ())
+        
+        jobs = self._claim_jobs(limit, lock_secs, worker_id, "AND shard = ?", (shard,))
+        if not jobs:
+            jobs = self._claim_jobs(limit, lock_secs, worker_id, "AND shard != ?", (shard,))
         return jobs
     
-    def get_all_jobs(self) -> List[Job]:
-        """Get all jobs."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM jobs ORDER BY created_at DESC")
-        rows = cursor.fetchall()
-        conn.close()
-        
-        jobs = []
-        for row in rows:
-            jobs.append(Job(
-                id=row["id"],
-                command=row["command"],
-                state=row["state"],
-                attempts=row["attempts"],
-                max_retries=row["max_retries"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-                next_retry_at=row["next_retry_at"],
-                error_message=row["error_message"],
-            ))
+    def _claim_jobs(self, limit: int, lock_secs: float, worker_id: Optional[str],
+                    shard_clause: str, shard_params: tuple) -> List[Job]:
+        """Claim ready jobs matching `shard_clause` in a single statement."""
+        now = time.time()
+        updated_at = _now_iso()
+        params = (
+            JobState.PROCESSING.value, now + lock_secs, worker_id, updated_at,
+            _now_us(), now, *shard_params, limit,
+        )
+        claim_sql = f"""
+            UPDATE jobs SET
+                state = ?,
+                locked_until = ?,
+                locked_by = ?,
+                updated_at = ?,
+                next_retry_at_us = NULL
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE {_READY_WHERE}
+                  AND locked_until < ?
+                  {shard_clause}
+                ORDER BY created_at
+                LIMIT ?
+            )
+        """
         
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            rows = self._connect().execute(claim_sql + f" RETURNING {_JOB_COLUMNS}", params).fetchall()
+        else:
+            # No RETURNING support: claim and read back in one transaction.
+            with self._transaction() as cursor:
+                cursor.execute(claim_sql, params)
+                rows = cursor.execute(
+                    f"SELECT {_JOB_COLUMNS} FROM jobs WHERE state = ? AND locked_until = ? AND updated_at = ?",
+                    (JobState.PROCESSING.value, now + lock_secs, updated_at),
+                ).fetchall()
+        
+        jobs = [Job._from_row(row) for row in rows]
+        
+        # RETURNING does not guarantee row order
+        jobs.sort(key=lambda job: job.created_at)
         return jobs
     
+    def claim_next_jobs(self, worker_id: str, limit: int, shard: Optional[int] = None,
+                        lock_secs: float = 300.0) -> List[Job]:
+        """Claim up to `limit` of the oldest ready jobs for `worker_id`.
+        
+        With `shard`, other shards are only tried when its own has no ready jobs.
+        """
+        return self.claim_ready_jobs(limit=limit, lock_secs=lock_secs, worker_id=worker_id, shard=shard)
+    
+    def claim_next_job(self, worker_id: str, shard: Optional[int] = None,
+                       lock_secs: float = 300.0) -> Optional[Job]:
+        """Claim the oldest ready job for `worker_id`, or return None."""
+        jobs = self.claim_next_jobs(worker_id, 1, shard=shard, lock_secs=lock_secs)
+        return jobs[0] if jobs else None
+    
+    def unclaim_jobs(self, job_ids: Iterable[str], worker_id: str) -> None:
+        """Return jobs claimed by `worker_id` but not started to `pending`."""
+        job_ids = tuple(job_ids)
+        if not job_ids:
+            return
+        
+        self._connect().execute(f"""
+            UPDATE jobs SET state = ?, locked_until = 0, locked_by = NULL, updated_at = ?
+            WHERE id IN ({', '.join('?' * len(job_ids))}) AND state = ? AND locked_by = ?
+        """, (JobState.PENDING.value, _now_iso(), *job_ids, JobState.PROCESSING.value, worker_id))
+        self._notify_workers(len(job_ids))
+    
+    def iter_all_jobs(self, offset: int = 0) -> Iterator[Job]:
+        """Iterate over all jobs, newest first, skipping the first `offset`."""
+        # SQLite treats a negative LIMIT as "no limit"
+        return self._iter_jobs(
+            f"SELECT {_JOB_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+            (offset,),
+        )
+    
+    def get_all_jobs(self, limit: Optional[int] = None, offset: int = 0) -> List[Job]:
+        """Get all jobs, newest first, optionally paginated."""
+        return list(islice(self.iter_all_jobs(offset), limit))
+    
     def update_job(self, job: Job) -> None:
         """Update an existing job."""
-        job.updated_at = datetime.utcnow().isoformat() + "Z"
-        
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
+        job.updated_at = _now_iso()
         
-        cursor.execute("""
+        self._connect().execute("""
             UPDATE jobs SET
                 command = ?,
                 state = ?,
@@ -249,7 +579,7 @@ class JobStorage:
                 max_retries = ?,
                 created_at = ?,
                 updated_at = ?,
-                next_retry_at = ?,
+                next_retry_at_us = ?,
                 error_message = ?
             WHERE id = ?
         """, (
@@ -259,168 +589,417 @@ class JobStorage:
             job.max_retries,
             job.created_at,
             job.updated_at,
-            job.next_retry_at,
+            job.next_retry_at_us,
             job.error_message,
             job.id,
         ))
+    
+    def finalize_job(self, job: Job, reason: Optional[str] = None,
+                     worker_id: Optional[str] = None) -> bool:
+        """Record a finished run of a job and release its lock in one write.
+        
+        Dead jobs are moved to the DLQ with `reason`; others get their new
+        state, attempts, retry time and error written in a single UPDATE.
+        
+        With `worker_id`, the result is only recorded while that worker
+        still holds the job's claim. Returns False if it was not recorded.
+        """
+        if job.state == JobState.DEAD:
+            return self.move_to_dlq(job, reason or "Max retries exceeded", worker_id)
         
-        conn.commit()
-        conn.close()
+        job.updated_at = _now_iso()
+        cursor = self._connect().execute("""
+            UPDATE jobs SET
+                state = ?,
+                attempts = ?,
+                updated_at = ?,
+                next_retry_at_us = ?,
+                error_message = ?,
+                locked_until = 0,
+                locked_by = NULL
+            WHERE id = ? AND (? IS NULL OR locked_by = ?)
+        """, (
+            job.state,
+            job.attempts,
+            job.updated_at,
+            job.next_retry_at_us,
+            job.error_message,
+            job.id,
+            worker_id,
+            worker_id,
+        ))
+        return cursor.rowcount == 1
     
     def delete_job(self, job_id: str) -> None:
         """Delete a job from the queue."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
-        
-        conn.commit()
-        conn.close()
+        self._connect().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
     
-    def move_to_dlq(self, job: Job, reason: str = "Max retries exceeded") -> None:
-        """Move a job to the dead letter queue."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
-        
-        moved_at = datetime.utcnow().isoformat() + "Z"
+    @staticmethod
+    def _insert_dlq_row(cursor: sqlite3.Cursor, job: Job, moved_at: str, reason: Optional[str]) -> None:
         cursor.execute("""
-            INSERT INTO dlq (id, job_data, moved_at, reason)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO dlq
+            (id, command, state, attempts, max_retries, created_at, updated_at,
+             next_retry_at_us, error_message, moved_at, reason, argv)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             job.id,
-            job.to_json(),
+            job.command,
+            job.state,
+            job.attempts,
+            job.max_retries,
+            job.created_at,
+            job.updated_at,
+            job.next_retry_at_us,
+            job.error_message,
             moved_at,
             reason,
+            _dump_argv(job.argv),
         ))
-        
-        # Delete from main queue
-        cursor.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
-        
-        conn.commit()
-        conn.close()
     
-    def get_dlq_jobs(self) -> List[Job]:
-        """Get all dead letter queue jobs."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def move_to_dlq(self, job: Job, reason: str = "Max retries exceeded",
+                    worker_id: Optional[str] = None) -> bool:
+        """Move a job to the dead letter queue.
         
-        cursor.execute("SELECT job_data FROM dlq ORDER BY moved_at DESC")
-        rows = cursor.fetchall()
-        conn.close()
+        With `worker_id`, the job is only moved while that worker still holds
+        its claim. Returns False if it was not moved.
+        """
+        moved_at = _now_iso()
+        
+        with self._transaction() as cursor:
+            # Delete from main queue
+            deleted = cursor.execute(
+                "DELETE FROM jobs WHERE id = ? AND (? IS NULL OR locked_by = ?)",
+                (job.id, worker_id, worker_id),
+            ).rowcount
+            if worker_id is not None and not deleted:
+                return False
+            
+            # The in-memory job carries the final state and error, so it is
+            # written directly rather than copied from the jobs row.
+            self._insert_dlq_row(cursor, job, moved_at, reason)
+        return True
+    
+    def get_dlq_jobs(self, limit: Optional[int] = None) -> List[Job]:
+        """Get dead letter queue jobs, newest first, at most `limit` if given."""
+        rows = self._connect().execute(
+            f"SELECT {_JOB_COLUMNS} FROM dlq ORDER BY moved_at DESC LIMIT ?",
+            (-1 if limit is None else limit,),
+        ).fetchall()
         
-        jobs = []
-        for row in rows:
-            jobs.append(Job.from_json(row["job_data"]))
+        jobs = [Job._from_row(row) for row in rows]
         
         return jobs
     
     def get_dlq_job(self, job_id: str) -> Optional[Job]:
         """Get a specific DLQ job."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT job_data FROM dlq WHERE id = ?", (job_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = self._connect().execute(f"SELECT {_JOB_COLUMNS} FROM dlq WHERE id = ?", (job_id,)).fetchone()
         
         if not row:
             return None
         
-        return Job.from_json(row["job_data"])
+        return Job._from_row(row)
     
     def remove_from_dlq(self, job_id: str) -> None:
         """Remove a job from the DLQ."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM dlq WHERE id = ?", (job_id,))
+        self._connect().execute("DELETE FROM dlq WHERE id = ?", (job_id,))
+    
+    def retry_dlq(self, ids: Optional[Iterable[str]] = None) -> List[str]:
+        """Move DLQ jobs back to the queue as fresh pending jobs.
         
-        conn.commit()
-        conn.close()
+        Retries the given job IDs, or every DLQ job if `ids` is None, in a
+        single transaction. Returns the IDs that were found and moved.
+        """
+        if ids is None:
+            where, params = "", ()
+        else:
+            params = tuple(dict.fromkeys(ids))
+            if not params:
+                return []
+            where = f"WHERE id IN ({', '.join('?' * len(params))})"
+        
+        with self._transaction() as cursor:
+            retried = [row[0] for row in cursor.execute(f"SELECT id FROM dlq {where}", params)]
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO jobs
+                (id, command, state, attempts, max_retries, created_at, updated_at,
+                 next_retry_at_us, error_message, shard, argv)
+                SELECT id, command, ?, 0, max_retries, created_at, ?, NULL, NULL, job_shard(id), argv
+                FROM dlq {where}
+            """, (JobState.PENDING.value, _now_iso(), *params))
+            cursor.execute(f"DELETE FROM dlq {where}", params)
+        
+        self._notify_workers(len(retried))
+        return retried
     
     def get_config(self) -> dict:
-        """Get configuration."""
-        with open(self.config_path, "r") as f:
-            return json.load(f)
+        """Get configuration.
+        
+        The config is cached and only re-read when the config revision has
+        changed, so job writes by other workers do not invalidate it.
+        """
+        rev = self.get_config_rev()
+        if self._cfg_cache is None or rev != self._cfg_rev:
+            self._cfg_cache = {
+                key: json.loads(value)
+                for key, value in self._connect().execute(
+                    "SELECT key, value FROM config WHERE key != ?", (_CONFIG_REV_KEY,)
+                )
+            }
+            self._cfg_rev = rev
+        return dict(self._cfg_cache)
+    
+    def get_config_rev(self) -> int:
+        """Return the config revision, which every set_config() call bumps."""
+        row = self._connect().execute(
+            "SELECT value FROM config WHERE key = ?", (_CONFIG_REV_KEY,)
+        ).fetchone()
+        return int(row[0]) if row else 0
     
     def set_config(self, key: str, value) -> None:
         """Set a configuration value."""
-        config = self.get_config()
-        config[key] = value
+        if key == _CONFIG_REV_KEY:
+            raise ValueError(f"'{key}' is maintained by queuectl and cannot be set")
         
-        with open(self.config_path, "w") as f:
-            json.dump(config, f, indent=2)
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+            cursor.execute("""
+                INSERT INTO config (key, value) VALUES (?, '1')
+                ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """, (_CONFIG_REV_KEY,))
+        self._cfg_cache = None
     
     def acquire_job_lock(self, job_id: str, duration_seconds: float = 60.0) -> bool:
         """Try to acquire a lock on a job. Returns True if successful."""
-        import time
-        
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
-        
         current_time = time.time()
         
-        # Check if lock is available
-        cursor.execute("SELECT locked_until FROM jobs WHERE id = ?", (job_id,))
-        row = cursor.fetchone()
-        
-        if row is None:
-            conn.close()
-            return False
-        
-        locked_until = row[0]
-        
-        if locked_until < current_time:
-            # Lock is free, acquire it
-            new_lock_time = current_time + duration_seconds
-            cursor.execute("UPDATE jobs SET locked_until = ? WHERE id = ?", 
-                         (new_lock_time, job_id))
-            conn.commit()
-            conn.close()
-            return True
+        # Conditional update: only one worker can win a free lock, and the
+        # check and the write happen in a single statement.
+        cursor = self._connect().execute(
+            "UPDATE jobs SET locked_until = ? WHERE id = ? AND locked_until < ?",
+            (current_time + duration_seconds, job_id, current_time),
+        )
         
-        conn.close()
-        return False
+        return cursor.rowcount == 1
     
-    def release_job_lock(self, job_id: str) -> None:
-        """Release a lock on a job."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
+    def extend_job_lock(self, job_id: str, worker_id: str, lock_secs: float) -> bool:
+        """Lock a job claimed by `worker_id` for another `lock_secs` seconds.
         
-        cursor.execute("UPDATE jobs SET locked_until = 0 WHERE id = ?", (job_id,))
-        
-        conn.commit()
-        conn.close()
+        Returns False if the worker no longer holds the job, e.g. because
+        its claim expired and the job was requeued.
+        """
+        cursor = self._connect().execute(
+            "UPDATE jobs SET locked_until = ? WHERE id = ? AND locked_by = ? AND state = ?",
+            (time.time() + lock_secs, job_id, worker_id, JobState.PROCESSING.value),
+        )
+        return cursor.rowcount == 1
     
-    def clear_expired_locks(self) -> None:
-        """Clear locks that have expired."""
-        import time
-        
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
+    def release_job_lock(self, job_id: str, worker_id: Optional[str] = None) -> None:
+        """Release a lock on a job, only if held by `worker_id` when given."""
+        self._connect().execute(
+            "UPDATE jobs SET locked_until = 0, locked_by = NULL "
+            "WHERE id = ? AND (? IS NULL OR locked_by = ?)",
+            (job_id, worker_id, worker_id),
+        )
+    
+    def clear_expired_locks(self) -> int:
+        """Clear locks that have expired and requeue the jobs they held.
         
+        A `processing` job whose lock expired was claimed by a worker that
+        died or hung. That run counts as a failed attempt: the job goes back
+        to `pending`, or to the DLQ once it has used up its retries, as a
+        failed run would. Returns the number of locks cleared.
+        """
         current_time = time.time()
-        cursor.execute("UPDATE jobs SET locked_until = 0 WHERE locked_until < ? AND locked_until > 0", 
-                      (current_time,))
-        
-        conn.commit()
-        conn.close()
+        updated_at = _now_iso()
+        max_retries = self.get_config().get("max_retries", DEFAULT_CONFIG["max_retries"])
+        error = "Lock expired: the worker running the job stopped or hung"
+        expired = "locked_until > 0 AND locked_until < ?"
+        out_of_retries = f"state = ? AND {expired} AND attempts + 1 >= ?"
+        out_of_retries_params = (JobState.PROCESSING.value, current_time, max_retries)
+        
+        with self._transaction() as cursor:
+            cursor.execute(f"""
+                INSERT INTO dlq
+                (id, command, state, attempts, max_retries, created_at, updated_at,
+                 next_retry_at_us, error_message, moved_at, reason, argv)
+                SELECT id, command, ?, attempts + 1, max_retries, created_at, ?, NULL, ?, ?, ?, argv
+                FROM jobs WHERE {out_of_retries}
+            """, (
+                JobState.DEAD.value, updated_at, error, updated_at,
+                f"Max retries ({max_retries}) exceeded. Last error: {error}",
+                *out_of_retries_params,
+            ))
+            dead = cursor.execute(f"DELETE FROM jobs WHERE {out_of_retries}", out_of_retries_params).rowcount
+            
+            requeued = cursor.execute(f"""
+                UPDATE jobs SET
+                    state = ?, attempts = attempts + 1, error_message = ?,
+                    locked_until = 0, locked_by = NULL, updated_at = ?
+                WHERE state = ? AND {expired}
+            """, (JobState.PENDING.value, error, updated_at, JobState.PROCESSING.value, current_time)).rowcount
+            
+            # Other locks (e.g. from acquire_job_lock) are just released
+            released = cursor.execute(
+                f"UPDATE jobs SET locked_until = 0, locked_by = NULL WHERE {expired}", (current_time,)
+            ).rowcount
+        
+        self._notify_workers(requeued)
+        return dead + requeued + released
     
     def count_jobs_by_state(self) -> dict:
         """Count jobs in each state."""
-        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        rows = self._connect().execute("""
             SELECT state, COUNT(*) as count FROM jobs GROUP BY state
-        """)
-        rows = cursor.fetchall()
-        conn.close()
+        """).fetchall()
         
         counts = {state.value: 0 for state in JobState}
         for state, count in rows:
             counts[state] = count
         
         return counts
+    
+    def get_status_summary(self) -> dict:
+        """Return job counts per state and the DLQ size in one query."""
+        rows = self._connect().execute("""
+            SELECT 'job:' || state, COUNT(*) FROM jobs GROUP BY state
+            UNION ALL
+            SELECT 'dlq', COUNT(*) FROM dlq
+        """).fetchall()
+        
+        counts = {state.value: 0 for state in JobState}
+        dlq_count = 0
+        for key, count in rows:
+            if key == "dlq":
+                dlq_count = count
+            else:
+                counts[key[len("job:"):]] = count
+        
+        return {"counts": counts, "dlq_count": dlq_count}
+    
+    @property
+    def wakeups_supported(self) -> bool:
+        """Whether idle workers can block until notified of new jobs."""
+        return hasattr(os, "mkfifo")
+    
+    def _get_wakeup_fd(self) -> Optional[int]:
+        """Open (creating if needed) the wake-up FIFO for reading.
+        
+        Returns None if the FIFO cannot be used, e.g. on a filesystem
+        without FIFO support; callers then fall back to polling.
+        """
+        if not self.wakeups_supported:
+            return None
+        
+        if self._wakeup_fd is None or self._wakeup_pid != os.getpid():
+            try:
+                try:
+                    if not stat.S_ISFIFO(os.stat(self.wakeup_path).st_mode):
+                        os.unlink(self.wakeup_path)
+                        os.mkfifo(self.wakeup_path)
+                except FileNotFoundError:
+                    try:
+                        os.mkfifo(self.wakeup_path)
+                    except FileExistsError:
+                        pass
+                
+                # Opening read-write keeps a writer attached, so select() only
+                # reports the FIFO readable when a wake-up byte is pending.
+                self._wakeup_fd = os.open(self.wakeup_path, os.O_RDWR | os.O_NONBLOCK)
+            except OSError:
+                return None
+            self._wakeup_pid = os.getpid()
+        
+        return self._wakeup_fd
+    
+    def _notify_workers(self, count: int = 1) -> None:
+        """Wake up to `count` workers blocked in wait_for_job()."""
+        global _enqueue_seq
+        if count <= 0:
+            return
+        
+        with _JOBS_ENQUEUED:
+            _enqueue_seq += 1
+            _JOBS_ENQUEUED.notify_all()
+        
+        if not self.wakeups_supported:
+            return
+        
+        try:
+            fd = os.open(self.wakeup_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            # No FIFO yet, or no worker has it open: nobody to wake
+            return
+        
+        try:
+            os.write(fd, b"\0" * min(count, 64))
+        except BlockingIOError:
+            # FIFO full: plenty of wake-ups are already pending
+            pass
+        finally:
+            os.close(fd)
+    
+    def wait_for_job(self, timeout: float, poll_interval: float = 1.0,
+                     interrupt_fd: Optional[int] = None) -> bool:
+        """Block until a job is enqueued or `timeout` seconds pass.
+        
+        Returns True if woken by a notification. Without FIFO support, other
+        processes' writes are detected by checking the database every
+        `poll_interval` seconds.
+        
+        If `interrupt_fd` becomes readable (e.g. a signal wake-up pipe), it is
+        drained and the wait ends early, returning False.
+        """
+        fd = self._get_wakeup_fd()
+        if fd is None:
+            return self._poll_for_job(timeout, poll_interval)
+        
+        fds = [fd] if interrupt_fd is None else [fd, interrupt_fd]
+        readable, _, _ = select.select(fds, [], [], timeout)
+        if interrupt_fd in readable:
+            _drain(interrupt_fd)
+            return False
+        if not readable:
+            return False
+        
+        # One wake-up covers every enqueue so far: the caller claims until
+        # the queue is empty, so leftover bytes would only cause idle wakes.
+        # Another worker may have drained the FIFO first; that is fine.
+        _drain(fd)
+        return True
+    
+    def _poll_for_job(self, timeout: float, poll_interval: float) -> bool:
+        """Wait for an enqueue in this process or a commit from another one."""
+        conn = self._connect()
+        deadline = time.monotonic() + timeout
+        
+        # Compare against what the previous wait saw, so changes made between
+        # two waits are not missed. The first wait always reports a change.
+        marks = self._local.poll_marks
+        while True:
+            # data_version changes whenever another connection commits
+            current = (_enqueue_seq, conn.execute("PRAGMA data_version").fetchone()[0])
+            if current != marks:
+                self._local.poll_marks = current
+                return True
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            
+            with _JOBS_ENQUEUED:
+                _JOBS_ENQUEUED.wait_for(lambda: _enqueue_seq != marks[0], min(remaining, poll_interval))
+    
+    def seconds_until_next_retry(self) -> Optional[float]:
+        """Seconds until the next scheduled retry, or None if none is scheduled."""
+        now_us = _now_us()
+        next_retry_at_us = self._connect().execute(
+            "SELECT MIN(next_retry_at_us) FROM jobs WHERE state = ? AND next_retry_at_us > ?",
+            (JobState.FAILED.value, now_us),
+        ).fetchone()[0]
+        
+        if next_retry_at_us is None:
+            return None
+        return (next_retry_at_us - now_us) / 1_000_000
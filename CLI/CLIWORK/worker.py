@@ -1,162 +1,415 @@
 """Worker process for executing jobs."""
+import locale
+import logging
 import subprocess
-import time
+import select
 import signal
 import os
-from datetime import datetime, timedelta
-from typing import Optional
-from .models import Job, JobState
-from .storage import JobStorage
+import tempfile
+import threading
+from typing import List, Optional
+from .log import log_to_queue, logger, start_listener
+from .models import Job, JobState, _now_us
+from .storage import DEFAULT_CONFIG, SHARD_COUNT, JobStorage
+
+# Commands with a pre-split argv are spawned directly where the exit can be
+# waited for with a timeout through a pidfd (Linux)
+_DIRECT_SPAWN = hasattr(os, "posix_spawnp") and hasattr(os, "pidfd_open")
 
 
 class Worker:
     """Executes jobs from the queue with retry logic."""
     
-    def __init__(self, worker_id: int):
+    # Longest an idle worker blocks waiting for an enqueue notification
+    IDLE_TIMEOUT = 60.0
+    # Jobs still running after this many seconds are killed
+    JOB_TIMEOUT = 300.0
+    # How much longer than JOB_TIMEOUT a job stays locked, to kill a job
+    # that timed out and record its result
+    LOCK_MARGIN = 5.0
+    
+    def __init__(self, worker_id: int, shard: Optional[int] = None,
+                 storage: Optional[JobStorage] = None):
         self.worker_id = worker_id
-        self.storage = JobStorage()
+        # Shard this worker claims from first before stealing from others
+        self.shard = worker_id % SHARD_COUNT if shard is None else shard
+        self.storage = storage if storage is not None else JobStorage()
         self.running = True
-        self._setup_signal_handlers()
+        # stdout/stderr files reused by every directly spawned job
+        self._output_files: Optional[tuple] = None
+        self._stop_signal = None
+        # Self-pipe that signals are written to while run() is active
+        self._signal_pipe: Optional[tuple] = None
+        # Signal handlers and wake-up fd to put back when run() returns
+        self._saved_handlers: dict = {}
+        self._saved_wakeup_fd = -1
+        # Config revision the cached settings below were built from
+        self._config_rev: Optional[int] = None
+        self._reload_config()
+    
+    def _reload_config(self) -> None:
+        """Read the settings used per job and precompute the backoff delays.
+        
+        Only the config revision is read unless the config has changed.
+        """
+        rev = self.storage.get_config_rev()
+        if rev == self._config_rev:
+            return
+        self._config_rev = rev
+        
+        config = self.storage.get_config()
+        self._max_retries = config.get("max_retries", DEFAULT_CONFIG["max_retries"])
+        self._backoff_max = config.get("backoff_max_seconds", DEFAULT_CONFIG["backoff_max_seconds"])
+        backoff_base = config.get("backoff_base", DEFAULT_CONFIG["backoff_base"])
+        # Delay before the retry that follows attempt n, at index n - 1
+        self._backoff_delays = [
+            min(backoff_base ** i, self._backoff_max) for i in range(max(1, self._max_retries))
+        ]
+        self._batch_size = max(1, int(config.get("batch_size", DEFAULT_CONFIG["batch_size"])))
     
     def _setup_signal_handlers(self):
-        """Setup graceful shutdown handlers."""
-        signal.signal(signal.SIGTERM, self._handle_shutdown)
-        signal.signal(signal.SIGINT, self._handle_shutdown)
+        """Setup graceful shutdown handlers.
+        
+        Installed from run() so that only the process actually running the
+        worker takes over SIGINT and SIGTERM. On POSIX, signals are also
+        written to a self-pipe that the idle wait selects on, so a stop
+        request wakes the worker immediately.
+        
+        Signals can only be handled on the main thread; a worker running in
+        another thread is stopped by setting `running` to False instead.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self._saved_handlers[signum] = signal.signal(signum, self._handle_shutdown)
+        
+        if os.name == "posix":
+            read_fd, write_fd = os.pipe()
+            os.set_blocking(read_fd, False)
+            os.set_blocking(write_fd, False)
+            self._saved_wakeup_fd = signal.set_wakeup_fd(write_fd)
+            self._signal_pipe = (read_fd, write_fd)
+    
+    def _restore_signal_handlers(self) -> None:
+        """Put back the handlers run() replaced and close the self-pipe."""
+        for signum, handler in self._saved_handlers.items():
+            signal.signal(signum, handler)
+        self._saved_handlers = {}
+        
+        if self._signal_pipe is None:
+            return
+        signal.set_wakeup_fd(self._saved_wakeup_fd)
+        self._saved_wakeup_fd = -1
+        for fd in self._signal_pipe:
+            os.close(fd)
+        self._signal_pipe = None
     
     def _handle_shutdown(self, signum, frame):
         """Handle shutdown signal gracefully."""
-        print(f"\n[Worker-{self.worker_id}] Received shutdown signal, finishing current job...")
+        # Only flag it here; logging from a signal handler could deadlock on
+        # the log queue's lock.
+        self._stop_signal = signum
         self.running = False
     
     def run(self, poll_interval: float = 1.0) -> None:
         """Run the worker, continuously fetching and executing jobs."""
-        print(f"[Worker-{self.worker_id}] Started")
+        self._setup_signal_handlers()
+        logger.info("[Worker-%d] Started", self.worker_id)
         
         try:
             while self.running:
-                self.storage.clear_expired_locks()
+                # Pick up config changes once per batch rather than per job
+                self._reload_config()
                 
-                # Get next pending job
-                job = self._get_next_job()
+                # Claim a batch of ready jobs in one statement
+                jobs = self._get_next_jobs()
                 
-                if job:
-                    self._execute_job(job)
+                if jobs:
+                    # Look for the next batch straight away until the queue drains
+                    self._run_batch(jobs)
                 else:
-                    # No job available, wait before checking again
-                    time.sleep(poll_interval)
+                    # No job available, wait until one is enqueued or a retry is due
+                    self.storage.wait_for_job(
+                        self._idle_wait_time(), poll_interval,
+                        interrupt_fd=self._signal_pipe[0] if self._signal_pipe else None,
+                    )
         
         except Exception as e:
-            print(f"[Worker-{self.worker_id}] Error: {e}")
+            logger.error("[Worker-%d] Error: %s", self.worker_id, e)
         finally:
-            print(f"[Worker-{self.worker_id}] Stopped")
+            self._restore_signal_handlers()
+            if self._stop_signal is not None:
+                logger.info("[Worker-%d] Received shutdown signal", self.worker_id)
+            logger.info("[Worker-%d] Stopped", self.worker_id)
     
-    def _get_next_job(self) -> Optional[Job]:
-        """Get the next pending job to execute."""
-        # Include pending jobs and failed jobs whose retry time has arrived
-        ready_jobs = self.storage.get_ready_jobs()
-
-        for job in ready_jobs:
-            # Try to acquire lock on this job
-            if self.storage.acquire_job_lock(job.id, duration_seconds=300.0):
-                # If the job was in FAILED state and its retry time has arrived,
-                # bring it back to pending so other workers see it consistently.
-                if job.state == JobState.FAILED:
-                    job.state = JobState.PENDING
-                    job.next_retry_at = None
-                    self.storage.update_job(job)
-                return job
-
-        return None
+    def _run_batch(self, jobs: List[Job]) -> None:
+        """Execute claimed jobs in order, handing back any left at shutdown."""
+        done = 0
+        try:
+            for job in jobs:
+                if not self.running:
+                    break
+                # The first job's claim is fresh; later ones get a new lock
+                # for their own run, unless the claim was lost meanwhile
+                if done and not self.storage.extend_job_lock(job.id, self.lock_owner, self._lock_secs):
+                    logger.debug("[Worker-%d] Lost the claim on job %s", self.worker_id, job.id)
+                else:
+                    # Releases the job's lock as part of recording the result
+                    self._execute_job(job, self.lock_owner)
+                done += 1
+        finally:
+            # Includes a job whose execution raised before it was finalized
+            if done < len(jobs):
+                self.storage.unclaim_jobs([job.id for job in jobs[done:]], self.lock_owner)
+    
+    def _idle_wait_time(self) -> float:
+        """How long an idle worker may block before polling again."""
+        timeout = self.IDLE_TIMEOUT
+        retry_in = self.storage.seconds_until_next_retry()
+        if retry_in is not None:
+            timeout = min(timeout, retry_in)
+        return timeout
+    
+    @property
+    def lock_owner(self) -> str:
+        """Name recorded on the jobs this worker claims."""
+        # Evaluated at claim time, so it carries the worker process's pid
+        # rather than the parent's.
+        return f"worker-{self.worker_id}@{os.getpid()}"
+    
+    def _get_next_jobs(self) -> List[Job]:
+        """Claim the next batch of ready jobs to execute."""
+        # Pending jobs and failed jobs whose retry time has arrived are
+        # claimed and locked in a single statement.
+        # Every job is locked for one run; _run_batch extends a job's lock
+        # when it starts, so later jobs in a batch do not need longer locks.
+        return self.storage.claim_next_jobs(
+            self.lock_owner, self._batch_size, self.shard, lock_secs=self._lock_secs,
+        )
+    
+    @property
+    def _lock_secs(self) -> float:
+        """How long a claimed or started job stays locked."""
+        return self.JOB_TIMEOUT + self.LOCK_MARGIN
     
-    def _execute_job(self, job: Job) -> None:
-        """Execute a job and handle the result."""
+    def _execute_job(self, job: Job, lock_owner: Optional[str] = None) -> None:
+        """Execute a job and record the result in a single write.
+        
+        For a claimed job, `lock_owner` is the claim it was run under; the
+        result is dropped if that claim expired and the job was taken over.
+        """
+        # Claiming already moved the job to processing in the database, so
+        # the new state and attempt count are only written with the result.
         job.state = JobState.PROCESSING
         job.attempts += 1
-        self.storage.update_job(job)
+        dlq_reason = None
         
-        print(f"[Worker-{self.worker_id}] Executing job {job.id}: {job.command}")
+        # Per-job lines are debug-level so fast jobs don't wait on logging
+        logger.debug("[Worker-%d] Executing job %s: %s", self.worker_id, job.id, job.command)
         
         try:
-            # Execute the command
-            result = subprocess.run(
-                job.command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=300.0,  # 5 minute timeout
-            )
+            # Simple commands run directly from their pre-split argv, which
+            # skips the intermediate /bin/sh. Anything else still goes
+            # through the shell.
+            if job.argv and _DIRECT_SPAWN:
+                result = self._spawn_direct(job.argv, self.JOB_TIMEOUT)
+            else:
+                result = self._run_with_alarm(job.argv or job.command, self.JOB_TIMEOUT, shell=not job.argv)
             
             if result.returncode == 0:
                 # Job succeeded
                 job.state = JobState.COMPLETED
                 job.error_message = None
-                print(f"[Worker-{self.worker_id}] Job {job.id} completed")
-                self.storage.update_job(job)
+                logger.debug("[Worker-%d] Job %s completed", self.worker_id, job.id)
             else:
                 # Job failed
-                self._handle_job_failure(job, result.stderr or result.stdout)
+                dlq_reason = self._handle_job_failure(job, result.stderr or result.stdout)
         
         except subprocess.TimeoutExpired:
-            self._handle_job_failure(job, "Job execution timeout")
+            dlq_reason = self._handle_job_failure(job, "Job execution timeout")
         except Exception as e:
-            self._handle_job_failure(job, str(e))
+            dlq_reason = self._handle_job_failure(job, str(e))
+        
+        if not self.storage.finalize_job(job, dlq_reason, lock_owner):
+            logger.warning("[Worker-%d] Lost the claim on job %s; its result was not recorded",
+                           self.worker_id, job.id)
+    
+    def _spawn_direct(self, argv: List[str], timeout: float) -> subprocess.CompletedProcess:
+        """Run `argv` with os.posix_spawnp, bypassing subprocess.
+        
+        The child writes its output straight into two reusable temporary
+        files, so there are no pipes or reader threads; the output is only
+        read back if the command fails. Raises subprocess.TimeoutExpired
+        after killing a command that outlives `timeout`.
+        """
+        if self._output_files is None:
+            self._output_files = (tempfile.TemporaryFile(), tempfile.TemporaryFile())
+        out_fd, err_fd = (f.fileno() for f in self._output_files)
+        for fd in (out_fd, err_fd):
+            os.ftruncate(fd, 0)
+            os.lseek(fd, 0, os.SEEK_SET)
+        
+        pid = os.posix_spawnp(
+            argv[0], argv, os.environ,
+            file_actions=[(os.POSIX_SPAWN_DUP2, out_fd, 1), (os.POSIX_SPAWN_DUP2, err_fd, 2)],
+            # Python ignores SIGPIPE; commands expect the default, as with subprocess
+            setsigdef=(signal.SIGPIPE, signal.SIGXFSZ),
+        )
+        pidfd = os.pidfd_open(pid)
+        try:
+            exited, _, _ = select.select([pidfd], [], [], timeout)
+            if not exited:
+                os.kill(pid, signal.SIGKILL)
+            _, status = os.waitpid(pid, 0)
         finally:
-            self.storage.release_job_lock(job.id)
+            os.close(pidfd)
+        
+        if not exited:
+            raise subprocess.TimeoutExpired(argv, timeout)
+        
+        returncode = os.waitstatus_to_exitcode(status)
+        stdout = stderr = ""
+        if returncode != 0:
+            stdout, stderr = (_decode_output(os.pread(fd, os.fstat(fd).st_size, 0)) for fd in (out_fd, err_fd))
+        return subprocess.CompletedProcess(argv, returncode, stdout, stderr)
     
-    def _handle_job_failure(self, job: Job, error_message: str) -> None:
-        """Handle a failed job - either retry or move to DLQ."""
-        config = self.storage.get_config()
-        max_retries = config.get("max_retries", 3)
-        backoff_base = config.get("backoff_base", 2)
-        backoff_max = config.get("backoff_max_seconds", 600)
+    def _run_with_alarm(self, command, timeout: float, shell: bool) -> subprocess.CompletedProcess:
+        """Run `command` with output captured, timed out by SIGALRM.
+        
+        subprocess.run() starts a helper thread per call to enforce its
+        timeout; here a single interval timer kills the command instead,
+        while this thread reads both pipes with select(). Signals can only
+        be handled on the main thread, so elsewhere this falls back to
+        subprocess.run().
+        """
+        if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+            return subprocess.run(
+                command, shell=shell, close_fds=True, capture_output=True, text=True, timeout=timeout,
+            )
+        
+        process = subprocess.Popen(
+            command, shell=shell, close_fds=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        
+        def on_alarm(signum, frame):
+            process.kill()
+            # Abandons the reads below even if a background child of the
+            # command still holds the pipes open
+            raise subprocess.TimeoutExpired(command, timeout)
+        
+        previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        out_fd, err_fd = process.stdout.fileno(), process.stderr.fileno()
+        output = {out_fd: [], err_fd: []}
+        try:
+            open_fds = [out_fd, err_fd]
+            while open_fds:
+                readable, _, _ = select.select(open_fds, [], [])
+                for fd in readable:
+                    data = os.read(fd, 65536)
+                    if data:
+                        output[fd].append(data)
+                    else:
+                        open_fds.remove(fd)
+            returncode = process.wait()
+        except subprocess.TimeoutExpired:
+            process.wait()
+            raise
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+            process.stdout.close()
+            process.stderr.close()
+        
+        stdout, stderr = (_decode_output(b"".join(output[fd])) for fd in (out_fd, err_fd))
+        return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+    
+    def _handle_job_failure(self, job: Job, error_message: str) -> Optional[str]:
+        """Mark a failed job for retry or for the DLQ, without writing it.
+        
+        Returns the DLQ reason when the job has run out of retries.
+        """
+        max_retries = self._max_retries
         
         if job.attempts < max_retries:
             # Schedule retry with exponential backoff
-            delay = min(backoff_base ** (job.attempts - 1), backoff_max)
-            next_retry = datetime.utcnow() + timedelta(seconds=delay)
+            delay = self._backoff_delays[min(job.attempts - 1, len(self._backoff_delays) - 1)]
             
             job.state = JobState.FAILED
             job.error_message = error_message
-            job.next_retry_at = next_retry.isoformat() + "Z"
+            job.next_retry_at_us = _now_us() + int(delay * 1_000_000)
             
-            print(f"[Worker-{self.worker_id}] Job {job.id} failed (attempt {job.attempts}/{max_retries}), "
-                  f"will retry in {delay}s")
-            
-            self.storage.update_job(job)
-            
-            # Schedule for retry: move back to pending if retry time has arrived
-            self._check_and_reschedule_failed_job(job, max_retries)
+            logger.info("[Worker-%d] Job %s failed (attempt %d/%d), will retry in %ss",
+                        self.worker_id, job.id, job.attempts, max_retries, delay)
+            return None
         else:
             # Max retries exceeded, move to DLQ
             job.state = JobState.DEAD
             job.error_message = error_message
             
-            print(f"[Worker-{self.worker_id}] Job {job.id} exceeded max retries, moving to DLQ")
-            
-            self.storage.move_to_dlq(job, f"Max retries ({max_retries}) exceeded. Last error: {error_message}")
-    
-    def _check_and_reschedule_failed_job(self, job: Job, max_retries: int) -> None:
-        """Check if a failed job is ready to be retried and reschedule if necessary."""
-        if job.next_retry_at:
-            next_retry_time = datetime.fromisoformat(job.next_retry_at.replace("Z", "+00:00"))
-            current_time = datetime.utcnow()
+            logger.warning("[Worker-%d] Job %s exceeded max retries, moving to DLQ", self.worker_id, job.id)
             
-            # Don't automatically reschedule, let a scheduler or next poll handle it
-            # The CLI status/list commands can show which jobs are ready for retry
+            return f"Max retries ({max_retries}) exceeded. Last error: {error_message}"
+
+
+def _decode_output(data: bytes) -> str:
+    """Decode captured command output as subprocess's text mode would."""
+    text = data.decode(locale.getpreferredencoding(False), "replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
 
+def _run_worker(worker_id: int, shard: int, poll_interval: float, log_queue, log_level: int) -> None:
+    """Process entry point: build the worker, and its storage, in the child."""
+    log_to_queue(log_queue, log_level)
+    Worker(worker_id, shard=shard).run(poll_interval)
 
-def start_workers(count: int, poll_interval: float = 1.0) -> None:
+
+def _janitor(stop: threading.Event) -> None:
+    """Requeue jobs with expired locks every `janitor_interval_s` until `stop` is set."""
+    storage = JobStorage()
+    try:
+        while True:
+            storage.clear_expired_locks()
+            interval = storage.get_config().get("janitor_interval_s", DEFAULT_CONFIG["janitor_interval_s"])
+            if stop.wait(max(0.1, float(interval))):
+                break
+    finally:
+        storage.close()
+
+
+def start_workers(count: int, poll_interval: float = 1.0, log_level: int = logging.INFO) -> None:
     """Start multiple worker processes."""
     import multiprocessing
     
+    # Workers are forked from a server process that has already imported
+    # queuectl, so each one starts without re-importing anything and never
+    # inherits an open SQLite connection from this process. Platforms
+    # without fork fall back to spawning fresh interpreters.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+    else:
+        ctx = multiprocessing.get_context("spawn")
+    
+    # Worker log lines are written by a listener thread in this process
+    log_queue = ctx.Queue()
+    listener = start_listener(log_queue)
+    
     workers = []
     
     for i in range(count):
-        worker = Worker(i + 1)
-        process = multiprocessing.Process(target=worker.run, args=(poll_interval,))
+        process = ctx.Process(
+            target=_run_worker, args=(i + 1, i % SHARD_COUNT, poll_interval, log_queue, log_level),
+        )
         process.start()
         workers.append(process)
     
+    # One thread sweeps expired locks for all workers, instead of every
+    # worker doing it on each poll.
+    janitor_stop = threading.Event()
+    threading.Thread(target=_janitor, args=(janitor_stop,), name="queuectl-janitor", daemon=True).start()
+    
     print(f"Started {count} workers")
     
     try:
@@ -168,3 +421,6 @@ def start_workers(count: int, poll_interval: float = 1.0) -> None:
             if process.is_alive():
                 process.terminate()
                 process.join(timeout=5)
+    finally:
+        janitor_stop.set()
+        listener.stop()
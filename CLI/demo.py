@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """Interactive demo script for QueueCTL."""
 import json
+import os
+import shlex
+import signal
 import time
 import subprocess
 import sys
@@ -10,18 +13,24 @@ import threading
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from click.testing import CliRunner
+
+from queuectl.cli import main
 from queuectl.storage import JobStorage
 
+# Commands run in this process, which saves an interpreter start per step
+_runner = CliRunner()
+
 
-def run_command(cmd):
-    """Run command and return output."""
-    print(f"\n$ {cmd}")
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr and "Worker" not in result.stderr:  # Filter worker logs
-        print(result.stderr, file=sys.stderr)
-    return result.returncode
+def run_command(*args):
+    """Run a queuectl command and print its output."""
+    print(f"\n$ queuectl {shlex.join(args)}")
+    result = _runner.invoke(main, list(args))
+    if result.output:
+        print(result.output)
+    if result.exception and not isinstance(result.exception, SystemExit):
+        print(f"Error: {result.exception}", file=sys.stderr)
+    return result.exit_code
 
 
 def demo():
@@ -30,9 +39,6 @@ def demo():
     print("QueueCTL - Background Job Queue System - DEMO".center(70))
     print("█"*70)
     
-    # Setup commands
-    setup_cmd = "python -m queuectl.cli"
-    
     # Clear any previous state
     print("\n[1] Clearing previous state...")
     storage = JobStorage()
@@ -56,61 +62,67 @@ def demo():
         },
     ]
     
-    for job_data in jobs_to_queue:
-        run_command(f"{setup_cmd} enqueue '{json.dumps(job_data)}'")
+    # All jobs go in with one command and one transaction
+    run_command("enqueue", json.dumps(jobs_to_queue))
     
     # 2. Show status
     print("\n[3] Checking queue status...")
-    run_command(f"{setup_cmd} status")
+    run_command("status")
     
     # 3. List pending jobs
     print("\n[4] Listing pending jobs...")
-    run_command(f"{setup_cmd} list --state pending")
+    run_command("list", "--state", "pending")
     
     # 4. Start a single worker to process jobs
     print("\n[5] Starting 1 worker (this will take a moment)...")
     print("    Worker will process jobs for ~5 seconds then exit...\n")
     
-    # Run worker with timeout
+    # Run worker with timeout. Its output is never read, so it goes to
+    # /dev/null rather than a pipe that could fill up and stall the worker.
+    # The new session lets the worker parent and its worker processes all be
+    # stopped together. The worker is the one command that still runs as its
+    # own process, since it is stopped with a signal.
     worker_proc = subprocess.Popen(
-        f"{setup_cmd} worker start --count 1 --poll-interval 0.5",
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+        [sys.executable, "-m", "queuectl.cli", "worker", "start", "--count", "1", "--poll-interval", "0.5"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
     )
     
     time.sleep(5)  # Let it process
-    worker_proc.terminate()
+    if hasattr(os, "killpg"):
+        os.killpg(os.getpgid(worker_proc.pid), signal.SIGTERM)
+    else:
+        worker_proc.terminate()
     worker_proc.wait(timeout=5)
     
     # 5. Check status after execution
     print("\n[6] Checking status after worker processing...")
-    run_command(f"{setup_cmd} status")
+    run_command("status")
     
     # 6. List completed jobs
     print("\n[7] Listing completed jobs...")
-    run_command(f"{setup_cmd} list --state completed")
+    run_command("list", "--state", "completed")
     
     # 7. List failed jobs
     print("\n[8] Listing failed jobs...")
-    run_command(f"{setup_cmd} list --state failed")
+    run_command("list", "--state", "failed")
     
     # 8. Check DLQ
     print("\n[9] Checking Dead Letter Queue...")
-    run_command(f"{setup_cmd} dlq list")
+    run_command("dlq", "list")
     
     # 9. Configuration
     print("\n[10] Viewing configuration...")
-    run_command(f"{setup_cmd} config get")
+    run_command("config", "get")
     
     # 10. Change config
     print("\n[11] Changing max-retries to 5...")
-    run_command(f"{setup_cmd} config set max_retries 5")
+    run_command("config", "set", "max_retries", "5")
     
     # 11. Show a specific job
     print("\n[12] Showing details for demo_job_1...")
-    run_command(f"{setup_cmd} show demo_job_1")
+    run_command("show", "demo_job_1")
     
     print("\n" + "█"*70)
     print("Demo completed!".center(70))
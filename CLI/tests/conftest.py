@@ -0,0 +1,34 @@
+"""Shared fixtures for the QueueCTL test suite."""
+import pytest
+from click.testing import CliRunner
+
+from queuectl.cli import main
+from queuectl.storage import JobStorage
+from queuectl.worker import Worker
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Storage backed by a fresh database in the test's temporary directory."""
+    storage = JobStorage(path=tmp_path / "q.db")
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def worker(storage):
+    """Worker that runs jobs against the test's `storage`."""
+    return Worker(1, storage=storage)
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    """Run queuectl commands in-process against the same database as `storage`."""
+    monkeypatch.setattr(JobStorage, "DB_PATH", tmp_path / "q.db")
+    monkeypatch.setattr(JobStorage, "CONFIG_PATH", tmp_path / "config.json")
+    runner = CliRunner()
+    
+    def invoke(*args):
+        return runner.invoke(main, list(args), catch_exceptions=False)
+    
+    return invoke
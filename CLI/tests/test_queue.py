@@ -0,0 +1,665 @@
+"""Comprehensive test suite for QueueCTL.
+
+Every test gets its own database (see conftest.py), so the suite can run
+in parallel with `pytest -n auto`.
+"""
+import json
+import os
+import signal
+import sqlite3
+import sys
+import time
+import subprocess
+import threading
+
+import pytest
+
+from queuectl.models import Job, JobState
+from queuectl.storage import DEFAULT_CONFIG, JobStorage, _shard_for
+
+
+def test_1_basic_job_enqueue(storage):
+    """Test 1: Basic job enqueue."""
+    job = Job(
+        id="test_job_1",
+        command="echo 'Hello QueueCTL'",
+    )
+    
+    storage.add_job(job)
+    retrieved = storage.get_job("test_job_1")
+    
+    assert retrieved is not None, "Job not stored"
+    assert retrieved.id == job.id, "Job ID mismatch"
+    assert retrieved.state == JobState.PENDING, "Initial state should be PENDING"
+
+
+def test_2_job_execution_success(storage, worker):
+    """Test 2: Successful job execution."""
+    job = Job(
+        id="test_job_2_success",
+        command="exit 0",  # Successful command
+    )
+    
+    storage.add_job(job)
+    
+    # Execute job manually to test execution logic
+    worker._execute_job(job)
+    
+    # Check that job was marked as completed
+    updated_job = storage.get_job("test_job_2_success")
+    assert updated_job.state == JobState.COMPLETED, f"Expected COMPLETED, got {updated_job.state}"
+
+
+def test_3_job_execution_failure(storage, worker):
+    """Test 3: Failed job execution and retry."""
+    job = Job(
+        id="test_job_3_fail",
+        command="exit 1",  # Failing command
+        max_retries=2,
+    )
+    
+    storage.add_job(job)
+    
+    # Execute job
+    worker._execute_job(job)
+    
+    # Check that job was marked as FAILED and scheduled for retry
+    updated_job = storage.get_job("test_job_3_fail")
+    assert updated_job.state == JobState.FAILED, f"Expected FAILED, got {updated_job.state}"
+    assert updated_job.attempts == 1, f"Expected 1 attempt, got {updated_job.attempts}"
+    assert updated_job.next_retry_at is not None, "Retry time should be scheduled"
+
+
+def test_4_exponential_backoff(storage):
+    """Test 4: Exponential backoff calculation."""
+    config = storage.get_config()
+    backoff_base = config.get("backoff_base", 2)
+    
+    # Simulate retry scheduling for multiple attempts
+    for attempt in range(1, 4):
+        delay = backoff_base ** (attempt - 1)
+        assert delay > 0, "Delay should be positive"
+
+
+def test_5_dlq_handling(storage, worker):
+    """Test 5: Dead Letter Queue handling."""
+    job = Job(
+        id="test_job_5_dlq",
+        command="failing_command_12345",
+        max_retries=1,
+    )
+    
+    storage.add_job(job)
+    
+    # Exhaust retries - manually set high attempts to trigger DLQ
+    for attempt in range(1, 3):
+        job.attempts = attempt
+        worker._execute_job(job)
+        
+        # Release lock to avoid database conflicts
+        try:
+            storage.release_job_lock("test_job_5_dlq")
+        except:
+            pass
+        
+        time.sleep(0.1)  # Small delay to allow database write
+        
+        job = storage.get_job("test_job_5_dlq")
+        
+        if job is None:
+            # Job moved to DLQ
+            break
+        
+        # Reload to refresh state
+        if job.state == JobState.FAILED:
+            # Force back to pending to retry
+            job.state = JobState.PENDING
+            storage.update_job(job)
+    
+    # Check DLQ
+    time.sleep(0.1)
+    dlq_job = storage.get_dlq_job("test_job_5_dlq")
+    assert dlq_job is not None, "Job should be in DLQ"
+    assert dlq_job.state == JobState.DEAD, f"Expected DEAD state, got {dlq_job.state}"
+    
+    # Check that main queue doesn't have it
+    regular_job = storage.get_job("test_job_5_dlq")
+    assert regular_job is None, "Job should be removed from main queue"
+
+
+def test_6_dlq_retry(storage):
+    """Test 6: Retrying DLQ jobs."""
+    job = Job(
+        id="test_job_6_dlq_retry",
+        command="echo 'retry success'",
+    )
+    
+    # Manually move to DLQ
+    storage.add_job(job)
+    storage.move_to_dlq(job, "Testing DLQ retry")
+    
+    # Verify it's in DLQ
+    dlq_job = storage.get_dlq_job("test_job_6_dlq_retry")
+    assert dlq_job is not None, "Job should be in DLQ"
+    
+    # Retry it
+    dlq_job.state = JobState.PENDING
+    dlq_job.attempts = 0
+    dlq_job.error_message = None
+    storage.add_job(dlq_job)
+    storage.remove_from_dlq("test_job_6_dlq_retry")
+    
+    # Verify it's back in main queue
+    regular_job = storage.get_job("test_job_6_dlq_retry")
+    assert regular_job is not None, "Job should be back in main queue"
+    assert regular_job.state == JobState.PENDING, f"Expected PENDING, got {regular_job.state}"
+
+
+def test_7_persistence(storage):
+    """Test 7: Job persistence across restarts."""
+    job = Job(
+        id="test_job_7_persist",
+        command="echo persistence",
+        state=JobState.PROCESSING,
+    )
+    
+    storage.add_job(job)
+    
+    # Create new storage instance (simulates restart)
+    storage2 = JobStorage(path=storage.db_path)
+    retrieved = storage2.get_job("test_job_7_persist")
+    
+    assert retrieved is not None, "Job should persist"
+    assert retrieved.state == JobState.PROCESSING, "Job state should be preserved"
+
+
+def test_8_job_locking(storage):
+    """Test 8: Job locking to prevent duplicate processing."""
+    job = Job(
+        id="test_job_8_lock",
+        command="echo locking",
+    )
+    
+    storage.add_job(job)
+    
+    # Try to acquire lock
+    lock1 = storage.acquire_job_lock("test_job_8_lock", duration_seconds=10)
+    assert lock1, "First lock acquisition should succeed"
+    
+    # Try to acquire lock again (should fail)
+    lock2 = storage.acquire_job_lock("test_job_8_lock", duration_seconds=10)
+    assert not lock2, "Second lock acquisition should fail"
+    
+    # Release lock
+    storage.release_job_lock("test_job_8_lock")
+    
+    # Now acquire should succeed
+    lock3 = storage.acquire_job_lock("test_job_8_lock", duration_seconds=10)
+    assert lock3, "Lock acquisition should succeed after release"
+
+
+def test_9_configuration(storage):
+    """Test 9: Configuration management."""
+    # Get config
+    config = storage.get_config()
+    assert "max_retries" in config, "Should have max_retries config"
+    assert "backoff_base" in config, "Should have backoff_base config"
+    
+    # Set config
+    storage.set_config("max_retries", 5)
+    updated_config = storage.get_config()
+    assert updated_config["max_retries"] == 5, "Config should be updated"
+
+
+def test_10_status_and_count(storage):
+    """Test 10: Status and job counting."""
+    test_jobs = [
+        Job(id=f"status_test_{i}", command=f"echo test_{i}", state=JobState.PENDING)
+        for i in range(3)
+    ]
+    
+    for job in test_jobs:
+        storage.add_job(job)
+    
+    # Count jobs by state
+    counts = storage.count_jobs_by_state()
+    
+    assert counts[JobState.PENDING] >= 3, "Should have at least 3 pending jobs"
+
+
+def test_11_claim_ready_jobs(storage):
+    """Test 11: Claiming ready jobs atomically."""
+    job = Job(
+        id="test_job_11_claim",
+        command="echo claim",
+    )
+    
+    storage.add_job(job)
+    
+    claimed = storage.claim_ready_jobs(limit=100, lock_secs=10)
+    claimed_ids = [j.id for j in claimed]
+    assert "test_job_11_claim" in claimed_ids, "Ready job should be claimed"
+    assert all(j.state == JobState.PROCESSING for j in claimed), "Claimed jobs should be PROCESSING"
+    
+    # A second claim must not hand out the same job again
+    claimed_again = storage.claim_ready_jobs(limit=100, lock_secs=10)
+    assert "test_job_11_claim" not in [j.id for j in claimed_again], "Job claimed twice"
+
+
+def test_12_worker_wakeup(storage):
+    """Test 12: Enqueue wakes idle workers."""
+    if not storage.wakeups_supported:
+        pytest.skip("Wake-up notifications not supported on this platform")
+    
+    assert not storage.wait_for_job(0.1), "Should not wake without an enqueue"
+    
+    producer = JobStorage(path=storage.db_path)
+    for i in range(3):
+        producer.add_job(Job(id=f"test_job_12_wakeup_{i}", command="echo wakeup"))
+    
+    assert storage.wait_for_job(5), "Enqueue should wake a waiting worker"
+    assert not storage.wait_for_job(0.1), "One wake-up should cover every pending enqueue"
+
+
+def test_13_dlq_bulk_retry(storage):
+    """Test 13: Retrying several DLQ jobs at once."""
+    job_ids = ["test_job_13_a", "test_job_13_b"]
+    for job_id in job_ids:
+        job = Job(id=job_id, command="echo bulk")
+        storage.add_job(job)
+        job.attempts = 3
+        job.error_message = "failed"
+        storage.move_to_dlq(job, "Testing bulk retry")
+    
+    retried = storage.retry_dlq(job_ids + ["test_job_13_missing"])
+    assert sorted(retried) == job_ids, f"Unexpected retried IDs: {retried}"
+    
+    for job_id in job_ids:
+        assert storage.get_dlq_job(job_id) is None, "Job should be removed from DLQ"
+        job = storage.get_job(job_id)
+        assert job is not None, "Job should be back in main queue"
+        assert job.state == JobState.PENDING, f"Expected PENDING, got {job.state}"
+        assert job.attempts == 0 and job.error_message is None, "Job should be reset"
+
+
+def test_14_poll_wakeup(storage):
+    """Test 14: Waking workers without FIFO support."""
+    # The first wait only records the current state
+    storage._poll_for_job(0, 0.05)
+    assert not storage._poll_for_job(0.1, 0.05), "Should not wake without a change"
+    
+    # Enqueue from a separate process: only the database changes
+    subprocess.run(
+        [sys.executable, "-c",
+         "from queuectl.storage import JobStorage; from queuectl.models import Job; "
+         f"JobStorage(path={str(storage.db_path)!r})"
+         ".add_job(Job(id='test_job_14_remote', command='echo remote'))"],
+        check=True,
+    )
+    assert storage._poll_for_job(5, 0.05), "Another process's enqueue should wake the worker"
+    
+    # Enqueue from another thread: the in-process notification fires long
+    # before the next database check
+    enqueuer = threading.Timer(
+        0.2, lambda: JobStorage(path=storage.db_path).add_job(Job(id="test_job_14_local", command="echo local"))
+    )
+    started = time.monotonic()
+    enqueuer.start()
+    assert storage._poll_for_job(5, 5), "In-process enqueue should wake the worker"
+    assert time.monotonic() - started < 4, "In-process wake-up should not wait for a poll"
+    enqueuer.join()
+
+
+def test_15_direct_command_output(storage, worker):
+    """Test 15: Commands run without a shell keep their errors and timeout."""
+    job = Job(id="test_job_15_fail", command="ls /nonexistent_queuectl_path", max_retries=3)
+    storage.add_job(job)
+    worker._execute_job(job)
+    
+    failed = storage.get_job("test_job_15_fail")
+    assert failed.state == JobState.FAILED, f"Expected FAILED, got {failed.state}"
+    assert "nonexistent_queuectl_path" in failed.error_message, "Command's stderr should be recorded"
+    
+    # Commands that outlive the timeout are killed
+    worker.JOB_TIMEOUT = 0.2
+    job = Job(id="test_job_15_slow", command="sleep 5", max_retries=3)
+    storage.add_job(job)
+    started = time.monotonic()
+    worker._execute_job(job)
+    assert time.monotonic() - started < 4, "Job should be stopped at its timeout"
+    assert storage.get_job("test_job_15_slow").error_message == "Job execution timeout"
+    
+    # Shell commands too, including ones that leave a child holding their output
+    job = Job(id="test_job_15_slow_shell", command="sleep 5 & sleep 5", max_retries=3)
+    storage.add_job(job)
+    started = time.monotonic()
+    worker._execute_job(job)
+    assert time.monotonic() - started < 4, "Shell job should be stopped at its timeout"
+    assert storage.get_job("test_job_15_slow_shell").error_message == "Job execution timeout"
+
+
+def test_16_cli_commands(storage, cli):
+    """Test 16: CLI commands run in-process against the test database."""
+    result = cli("enqueue", '{"id":"test_job_16","command":"echo one"}')
+    assert result.exit_code == 0
+    assert "test_job_16" in result.output
+    
+    result = cli("enqueue", '[{"command":"echo two"},"echo three"]')
+    assert "2 job(s) enqueued" in result.output
+    assert storage.count_jobs_by_state()["pending"] == 3, "CLI jobs should land in the test database"
+    assert all(job.updated_at >= job.created_at for job in storage.get_all_jobs()), \
+        "A job cannot be updated before it was created"
+    
+    assert "echo one" in cli("show", "test_job_16").output
+    assert cli("config", "set", "max_retries", "5").exit_code == 0
+    assert storage.get_config()["max_retries"] == 5
+
+
+def test_17_argv_follows_command(storage):
+    """Test 17: A stored job's argv always comes from its command."""
+    storage.add_job(Job(id="test_job_17", command="echo new", argv=["echo", "OLD"]))
+    assert storage.get_job("test_job_17").argv == ["echo", "new"], "argv should be derived from the command"
+    
+    storage.add_jobs([Job(id="test_job_17", command="echo newer", argv=["echo", "OLD"])])
+    assert storage.get_job("test_job_17").argv == ["echo", "newer"], "add_jobs should derive argv too"
+
+
+def test_18_expired_claims_requeued(storage):
+    """Test 18: Jobs whose claim expired are claimed again after a sweep."""
+    storage.add_jobs(Job(id=f"test_job_18_{i}", command="echo crashed") for i in range(3))
+    claimed = storage.claim_next_jobs("worker-a", 3, lock_secs=0.05)
+    assert len(claimed) == 3, f"Expected 3 claimed jobs, got {len(claimed)}"
+    assert storage.claim_next_jobs("worker-b", 3) == [], "Locked jobs should not be claimed"
+    
+    time.sleep(0.1)
+    assert storage.clear_expired_locks() == 3, "Every expired claim should be cleared"
+    assert storage.count_jobs_by_state()["pending"] == 3, "Expired claims should be pending again"
+    
+    reclaimed = storage.claim_next_jobs("worker-b", 3)
+    assert sorted(job.id for job in reclaimed) == sorted(job.id for job in claimed), "Jobs should be claimable again"
+
+
+def test_19_worker_signal_handling(storage, worker):
+    """Test 19: Workers run off the main thread and restore signal handlers."""
+    worker.IDLE_TIMEOUT = 0.1
+    storage.add_job(Job(id="test_job_19_thread", command="echo thread"))
+    thread = threading.Thread(target=worker.run, args=(0.1,))
+    thread.start()
+    deadline = time.monotonic() + 5
+    while storage.get_job("test_job_19_thread").state != JobState.COMPLETED and time.monotonic() < deadline:
+        time.sleep(0.05)
+    worker.running = False
+    thread.join(5)
+    assert not thread.is_alive(), "Threaded worker should stop when running is cleared"
+    assert storage.get_job("test_job_19_thread").state == JobState.COMPLETED, "Threaded worker should run jobs"
+    
+    # On the main thread, SIGTERM stops the worker and the old handler comes back
+    previous = signal.getsignal(signal.SIGTERM)
+    worker.running = True
+    threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGTERM)).start()
+    worker.run(0.1)
+    assert worker._stop_signal == signal.SIGTERM, "SIGTERM should stop the worker"
+    assert signal.getsignal(signal.SIGTERM) is previous, "Previous SIGTERM handler should be restored"
+
+
+def test_20_direct_command(storage, worker):
+    """Test 20: Simple commands are stored pre-split and run without a shell."""
+    storage.add_job(Job(id="test_job_20_direct", command="echo 'no shell'"))
+    stored = storage.get_job("test_job_20_direct")
+    assert stored.argv == ["echo", "no shell"], f"Unexpected argv: {stored.argv}"
+    
+    worker._execute_job(stored)
+    assert storage.get_job("test_job_20_direct").state == JobState.COMPLETED, "Direct job should complete"
+
+
+def test_21_backoff_table(storage, worker):
+    """Test 21: The worker precomputes backoff delays, capped at backoff_max_seconds."""
+    config = storage.get_config()
+    backoff_base = config.get("backoff_base", 2)
+    backoff_max = config.get("backoff_max_seconds", 600)
+    for attempt in range(1, config.get("max_retries", 3)):
+        expected = min(backoff_base ** (attempt - 1), backoff_max)
+        assert worker._backoff_delays[attempt - 1] == expected, "Backoff table mismatch"
+
+
+def test_22_config_revision(storage):
+    """Test 22: Every config change bumps the config revision."""
+    rev = storage.get_config_rev()
+    storage.set_config("max_retries", 5)
+    assert storage.get_config_rev() == rev + 1, "set_config should bump the config revision"
+    assert "config_rev" not in storage.get_config(), "Revision should not be listed as a setting"
+
+
+def test_23_config_cache(storage):
+    """Test 23: A cached config picks up changes made through another connection."""
+    assert storage.get_config()["max_retries"] != 5, "Test needs a different starting value"
+    JobStorage(path=storage.db_path).set_config("max_retries", 5)
+    assert storage.get_config()["max_retries"] == 5, "Config change should be visible"
+
+
+def test_24_bulk_enqueue(storage):
+    """Test 24: Adding many jobs in one batch."""
+    jobs = [Job(id=f"test_job_24_{i}", command=f"echo {i}") for i in range(3)]
+    assert storage.add_jobs(jobs) == 3, "All jobs should be added in one batch"
+    assert all(storage.get_job(job.id) is not None for job in jobs), "Every job should be stored"
+
+
+def test_25_status_summary(storage):
+    """Test 25: The status summary matches the per-state counts and the DLQ."""
+    storage.add_job(Job(id="test_job_25_pending", command="echo pending"))
+    dead = Job(id="test_job_25_dead", command="echo dead")
+    storage.add_job(dead)
+    storage.move_to_dlq(dead, "Testing status summary")
+    
+    summary = storage.get_status_summary()
+    assert summary["counts"] == storage.count_jobs_by_state(), "Summary counts should match count_jobs_by_state"
+    assert summary["dlq_count"] == 1, "Summary DLQ count mismatch"
+
+
+def test_26_claim_owner_release(storage):
+    """Test 26: Only the worker holding a claim can release its lock."""
+    storage.add_job(Job(id="test_job_26_owner", command="echo owner"))
+    claimed_job = storage.claim_next_job("worker-a")
+    assert claimed_job is not None and claimed_job.id == "test_job_26_owner", "Job should be claimed"
+    storage.release_job_lock(claimed_job.id, "worker-b")
+    assert not storage.acquire_job_lock(claimed_job.id), "Lock released by the wrong worker"
+    storage.release_job_lock(claimed_job.id, "worker-a")
+    assert storage.acquire_job_lock(claimed_job.id), "Owner should release the lock"
+
+
+def test_27_shard_stealing(storage):
+    """Test 27: Workers prefer their own shard and steal from others when it is empty."""
+    storage.add_job(Job(id="test_job_27_shard_a", command="echo a"))
+    storage.add_job(Job(id="test_job_27_shard_b", command="echo b"))
+    shard_b = _shard_for("test_job_27_shard_b")
+    assert shard_b != _shard_for("test_job_27_shard_a"), "Test jobs should hash to different shards"
+    own = storage.claim_next_jobs("worker-a", 2, shard=shard_b)
+    assert [job.id for job in own] == ["test_job_27_shard_b"], "Worker should only steal once its own shard is empty"
+    stolen = storage.claim_next_job("worker-a", shard=shard_b)
+    assert stolen is not None and stolen.id == "test_job_27_shard_a", "Worker should steal from other shards"
+
+
+def test_28_batch_claim(storage):
+    """Test 28: Batches are claimed in one call and unstarted jobs can be handed back."""
+    storage.add_job(Job(id="test_job_28_batch_a", command="echo a"))
+    storage.add_job(Job(id="test_job_28_batch_b", command="echo b"))
+    batch = storage.claim_next_jobs("worker-a", 2)
+    assert len(batch) == 2, f"Expected a batch of 2, got {len(batch)}"
+    storage.unclaim_jobs([job.id for job in batch], "worker-a")
+    assert all(storage.get_job(job.id).state == JobState.PENDING for job in batch), "Jobs should be pending again"
+
+
+def test_29_enqueue_file(storage, cli, tmp_path):
+    """Test 29: Enqueueing a file of JSON jobs, JSON strings and plain commands."""
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text(
+        '{"id": "test_job_29_object", "command": "echo object"}\n'
+        '"echo quoted"\n'
+        '\n'
+        'echo plain\n'
+        '["echo one", {"command": "echo two"}]\n'
+    )
+    result = cli("enqueue", "--file", str(jobs_file), "--max-retries", "5")
+    assert result.exit_code == 0, result.output
+    assert "5 job(s) enqueued" in result.output
+    
+    jobs = storage.get_all_jobs()
+    assert sorted(job.command for job in jobs) == [
+        "echo object", "echo one", "echo plain", "echo quoted", "echo two",
+    ], "JSON strings should be unwrapped and plain lines kept as-is"
+    assert storage.get_job("test_job_29_object") is not None, "A JSON job should keep its ID"
+    assert all(job.max_retries == 5 for job in jobs), "--max-retries should apply to every job"
+
+
+def test_30_baseline_migration(tmp_path):
+    """Test 30: A database and config file from the original layout are carried over."""
+    db_path = tmp_path / "q.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        CREATE TABLE jobs (
+            id TEXT PRIMARY KEY,
+            command TEXT NOT NULL,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_retries INTEGER NOT NULL DEFAULT 3,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            next_retry_at TEXT,
+            error_message TEXT,
+            locked_until REAL DEFAULT 0
+        );
+        CREATE TABLE dlq (
+            id TEXT PRIMARY KEY,
+            job_data TEXT NOT NULL,
+            moved_at TEXT NOT NULL,
+            reason TEXT
+        );
+    """)
+    conn.execute(
+        "INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at, next_retry_at, error_message)"
+        " VALUES ('test_job_30_failed', 'echo retry', 'failed', 1, 3, '2025-01-01T00:00:00Z',"
+        " '2025-01-01T00:00:01Z', '2030-01-01T00:00:00.500000Z', 'boom')"
+    )
+    # DLQ entries were stored as the job's JSON
+    dead = {
+        "id": "test_job_30_dead", "command": "exit 1", "state": "dead", "attempts": 3, "max_retries": 3,
+        "created_at": "2025-01-01T00:00:00Z", "updated_at": "2025-01-02T00:00:00Z",
+        "next_retry_at": None, "error_message": "gave up",
+    }
+    conn.execute(
+        "INSERT INTO dlq (id, job_data, moved_at, reason) VALUES (?, ?, '2025-01-02T00:00:00Z', 'Max retries exceeded')",
+        (dead["id"], json.dumps(dead)),
+    )
+    conn.commit()
+    conn.close()
+    (tmp_path / "config.json").write_text(json.dumps({"max_retries": 7, "backoff_base": 3, "backoff_max_seconds": 600}))
+    
+    storage = JobStorage(path=db_path)
+    try:
+        failed = storage.get_job("test_job_30_failed")
+        assert failed.state == JobState.FAILED and failed.attempts == 1 and failed.error_message == "boom"
+        assert failed.next_retry_at == "2030-01-01T00:00:00.500000Z", f"Retry time changed: {failed.next_retry_at}"
+        
+        migrated = storage.get_dlq_job("test_job_30_dead")
+        assert migrated is not None, "DLQ entry should be carried over"
+        assert (migrated.command, migrated.attempts, migrated.error_message) == ("exit 1", 3, "gave up")
+        assert storage.get_status_summary()["dlq_count"] == 1
+        
+        config = storage.get_config()
+        assert (config["max_retries"], config["backoff_base"]) == (7, 3), "config.json settings should be imported"
+        assert config["batch_size"] == DEFAULT_CONFIG["batch_size"], "New settings should get their defaults"
+    finally:
+        storage.close()
+
+
+def test_31_wakeup_fifo_unavailable(storage, monkeypatch):
+    """Test 31: Workers fall back to polling when the wake-up FIFO cannot be created."""
+    def mkfifo(path, *args, **kwargs):
+        raise PermissionError(1, "Operation not permitted", str(path))
+    
+    monkeypatch.setattr(os, "mkfifo", mkfifo)
+    started = time.monotonic()
+    storage.wait_for_job(0.2, 0.05)
+    assert time.monotonic() - started < 4, "Wait should fall back to polling"
+    
+    # The fallback still notices jobs enqueued by other connections
+    JobStorage(path=storage.db_path).add_job(Job(id="test_job_31", command="echo poll"))
+    assert storage.wait_for_job(5, 0.05), "Polling should pick up the enqueue"
+
+
+def test_32_batch_locks(storage, worker):
+    """Test 32: Workers claim one job by default and lock each job for a single run."""
+    storage.add_jobs(Job(id=f"test_job_32_{i}", command="echo batch") for i in range(3))
+    claimed = worker._get_next_jobs()
+    assert len(claimed) == 1, "By default a worker should leave other jobs to idle workers"
+    locked_until = sqlite3.connect(str(storage.db_path)).execute(
+        "SELECT locked_until FROM jobs WHERE id = ?", (claimed[0].id,)
+    ).fetchone()[0]
+    assert locked_until - time.time() <= worker.JOB_TIMEOUT + worker.LOCK_MARGIN, "Lock should cover one run"
+    assert not storage.extend_job_lock(claimed[0].id, "worker-b", 60), "Only the claiming worker can extend a lock"
+    assert storage.extend_job_lock(claimed[0].id, worker.lock_owner, 60), "The claiming worker can extend its lock"
+    
+    # A job whose claim was lost before it started is skipped
+    storage.set_config("batch_size", 2)
+    worker._reload_config()
+    batch = worker._get_next_jobs()
+    assert len(batch) == 2, f"Expected a batch of 2, got {len(batch)}"
+    storage.unclaim_jobs([batch[1].id], worker.lock_owner)
+    worker._run_batch(batch)
+    assert storage.get_job(batch[0].id).state == JobState.COMPLETED, "First job should run"
+    assert storage.get_job(batch[1].id).state == JobState.PENDING, "Job with a lost claim should not run"
+
+
+def test_33_stale_claim_result(storage):
+    """Test 33: A worker whose claim expired cannot overwrite the job's new owner."""
+    storage.add_job(Job(id="test_job_33", command="echo stale"))
+    stale = storage.claim_next_job("worker-a", lock_secs=0.05)
+    time.sleep(0.1)
+    storage.clear_expired_locks()
+    assert storage.claim_next_job("worker-b") is not None, "Requeued job should be claimed again"
+    
+    stale.state = JobState.COMPLETED
+    assert not storage.finalize_job(stale, worker_id="worker-a"), "Stale result should be rejected"
+    assert storage.get_job("test_job_33").state == JobState.PROCESSING, "New owner's run should be untouched"
+    stale.state = JobState.DEAD
+    assert not storage.finalize_job(stale, "gave up", "worker-a"), "Stale DLQ move should be rejected"
+    assert storage.get_dlq_job("test_job_33") is None and storage.get_job("test_job_33") is not None
+    
+    stale.state = JobState.COMPLETED
+    assert storage.finalize_job(stale, worker_id="worker-b"), "The current owner records the result"
+    assert storage.get_job("test_job_33").state == JobState.COMPLETED
+
+
+def test_34_expired_claims_use_retries(storage):
+    """Test 34: An expired claim counts as an attempt, and ends in the DLQ once retries run out."""
+    storage.set_config("max_retries", 2)
+    storage.add_job(Job(id="test_job_34", command="echo hangs"))
+    
+    storage.claim_next_job("worker-a", lock_secs=0.05)
+    time.sleep(0.1)
+    assert storage.clear_expired_locks() == 1
+    requeued = storage.get_job("test_job_34")
+    assert requeued.state == JobState.PENDING and requeued.attempts == 1, "Expired claim should count as an attempt"
+    assert "Lock expired" in requeued.error_message
+    
+    storage.claim_next_job("worker-a", lock_secs=0.05)
+    time.sleep(0.1)
+    assert storage.clear_expired_locks() == 1
+    assert storage.get_job("test_job_34") is None, "Job should leave the queue once out of retries"
+    dead = storage.get_dlq_job("test_job_34")
+    assert dead is not None and dead.state == JobState.DEAD and dead.attempts == 2, "Job should be in the DLQ"
+
+
+def test_35_enqueue_single_forms(storage, cli):
+    """Test 35: A single JSON job, JSON string or plain command gets an ID and --max-retries."""
+    for job_data in ('{"command": "echo object"}', '"echo quoted"', "echo plain", "true"):
+        result = cli("enqueue", job_data, "--max-retries", "5")
+        assert result.exit_code == 0, result.output
+    
+    jobs = storage.get_all_jobs()
+    assert sorted(job.command for job in jobs) == ["echo object", "echo plain", "echo quoted", "true"]
+    assert all(job.id and job.max_retries == 5 for job in jobs), "Every form should get an ID and --max-retries"
+    
+    result = cli("enqueue", '{"id": "test_job_35", "command": "echo kept", "max_retries": 2}', "--max-retries", "5")
+    assert result.exit_code == 0, result.output
+    assert storage.get_job("test_job_35").max_retries == 2, "Fields in the JSON job should win"